@@ -1,6 +1,8 @@
 import os
 import sys
 
+import pytest
+
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(root_dir)
 
@@ -31,3 +33,13 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(scope='session', autouse=True)
+def test_settings(django_test_environment):
+    # те же настройки, что и у manage.py test (yatube/test_runner.py)
+    from django.test import override_settings
+    from yatube.test_runner import TEST_SETTINGS
+
+    with override_settings(**TEST_SETTINGS):
+        yield
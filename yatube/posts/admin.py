@@ -1,25 +1,62 @@
 from django.contrib import admin
 
+from . import search
 from .models import Comment, Follow, Group, Post
+from .paginators import EstimatedCountPaginator
 
 
-class PostAdmin(admin.ModelAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Список без COUNT(*) по всей таблице и без выпадающих списков
+    на все строки связанных таблиц в форме.
+    """
 
-    list_display = ("pk", "text", "pub_date", "author")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = "-пусто-"
+
+
+class PostAdmin(LargeTableAdmin):
+
+    list_display = ("pk", "text", "pub_date", "author", "group")
+    list_select_related = ("author", "group")
     search_fields = ("text",)
     list_filter = ("pub_date",)
-    empty_value_display = "-пусто-"
+    raw_id_fields = ("author", "group")
+
+    def get_search_results(self, request, queryset, search_term):
+        # тот же индекс FTS5, что и у поиска на сайте, вместо LIKE '%q%'
+        if not search_term:
+            return queryset, False
+        return queryset.filter(pk__in=search.post_ids(search_term)), False
 
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(LargeTableAdmin):
 
     list_display = ("pk", "title", "slug", "description")
-    search_fields = ("description",)
+    search_fields = ("title", "description")
     list_filter = ("title",)
-    empty_value_display = "-пусто-"
+
+
+class CommentAdmin(LargeTableAdmin):
+
+    list_display = ("pk", "text", "created", "author", "post")
+    list_select_related = ("author", "post")
+    list_filter = ("created",)
+    # по pk, а не по created: для сортировки по created нет индекса
+    ordering = ("-pk",)
+    raw_id_fields = ("author", "post")
+
+
+class FollowAdmin(LargeTableAdmin):
+
+    list_display = ("pk", "user", "author")
+    list_select_related = ("user", "author")
+    search_fields = ("=user__username", "=author__username")
+    raw_id_fields = ("user", "author")
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
-admin.site.register(Comment)
-admin.site.register(Follow)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
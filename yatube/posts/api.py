@@ -0,0 +1,131 @@
+"""
+JSON API для чтения лент и постов и массовых подписок.
+
+Ленты отдаются курсорными страницами. ETag и Last-Modified строятся
+из версий областей ленты (см. feed_cache), поэтому повторный запрос
+с If-None-Match или If-Modified-Since получает 304 без обращения к базе.
+"""
+import json
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_POST
+
+from . import follows
+from .conditional import conditional_response, feed_validators, make_etag
+from .models import Group, Post, User
+from .paginators import CursorPaginator
+from .timeline import timeline_posts
+
+JSON_OPTIONS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def serialize_post(post):
+    return {
+        'id': post.id,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'comments': post.comment_count,
+    }
+
+
+def feed_response(request, queryset, scopes, **cursor_fields):
+    def build():
+        paginator = CursorPaginator(
+            queryset, settings.POST_PER_PAGE, **cursor_fields
+        )
+        page = paginator.get_page(request.GET.get('cursor'))
+        return JsonResponse({
+            'results': [serialize_post(post) for post in page],
+            'next': paginator.next_cursor,
+            'previous': paginator.previous_cursor,
+        }, json_dumps_params=JSON_OPTIONS)
+
+    etag, last_modified = feed_validators(request, scopes)
+    return conditional_response(request, etag, last_modified, build)
+
+
+def index(request):
+    return feed_response(request, Post.objects.for_feed(), ('posts',))
+
+
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(
+        request, group.posts_group.for_feed(), (f'group:{group.pk}',)
+    )
+
+
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(
+        request, author.posts.for_feed(), (f'profile:{author.pk}',)
+    )
+
+
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Нужна авторизация'}, status=401)
+    follow_posts, cursor_fields = timeline_posts(request.user)
+    return feed_response(
+        request, follow_posts, ('posts', f'follow:{request.user.pk}'),
+        **cursor_fields
+    )
+
+
+def post_detail(request, post_id):
+    state = get_object_or_404(
+        Post.objects.values('updated', 'comment_count'), pk=post_id
+    )
+    updated = state['updated']
+
+    def build():
+        post = Post.objects.for_feed().get(pk=post_id)
+        return JsonResponse(serialize_post(post),
+                            json_dumps_params=JSON_OPTIONS)
+
+    etag = make_etag(
+        f'{post_id}|{updated.isoformat()}|{state["comment_count"]}'
+    )
+    return conditional_response(
+        request, etag, int(updated.timestamp()), build
+    )
+
+
+def bulk_response(request, action):
+    """
+    Тело запроса: {"usernames": [...]}, не больше FOLLOW_BULK_LIMIT имён.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Нужна авторизация'}, status=401)
+    try:
+        usernames = json.loads(request.body)['usernames']
+    except (ValueError, KeyError, TypeError):
+        usernames = None
+    if not isinstance(usernames, list) or not all(
+        isinstance(name, str) for name in usernames
+    ):
+        return JsonResponse(
+            {'detail': 'Ожидается {"usernames": [...]}'}, status=400
+        )
+    if len(usernames) > settings.FOLLOW_BULK_LIMIT:
+        return JsonResponse(
+            {'detail': f'Не больше {settings.FOLLOW_BULK_LIMIT} имён'},
+            status=400
+        )
+    return JsonResponse(action(request.user, usernames),
+                        json_dumps_params=JSON_OPTIONS)
+
+
+@require_POST
+def follow_bulk(request):
+    return bulk_response(request, follows.follow_many)
+
+
+@require_POST
+def unfollow_bulk(request):
+    return bulk_response(request, follows.unfollow_many)
@@ -0,0 +1,76 @@
+"""
+Условные ответы (304) по версиям областей ленты из feed_cache.
+
+ETag и Last-Modified считаются до запросов ленты и рендеринга: версия
+области — это time.time_ns() её последнего изменения, она лежит в кеше.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import feed_cache
+
+
+def make_etag(state):
+    return quote_etag(hashlib.sha1(state.encode()).hexdigest())
+
+
+def feed_validators(request, scopes):
+    """
+    (ETag, Last-Modified) страницы ленты с данными из областей scopes.
+    """
+    versions = [
+        feed_cache.version(scope) for scope in tuple(scopes) + ('groups',)
+    ]
+    state = f'{request.get_full_path()}|{versions}'
+    return make_etag(state), max(versions) // 10 ** 9
+
+
+def conditional_response(request, etag, last_modified, build):
+    """
+    Ответ 304, если у клиента актуальная версия, иначе результат build().
+    """
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = build()
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def anonymous_conditional(scopes):
+    """
+    Гостям отвечаем 304 по версиям областей scopes(**kwargs) и разрешаем
+    обратному прокси хранить страницу ANONYMOUS_CACHE_SECONDS секунд.
+
+    Страницы пользователей персональны и помечаются как private.
+    Если scopes вернул None (объекта нет), просто вызываем view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.user.is_authenticated:
+                response = view(request, *args, **kwargs)
+                patch_cache_control(response, private=True)
+                return response
+            view_scopes = scopes(**kwargs)
+            if view_scopes is None:
+                return view(request, *args, **kwargs)
+            etag, last_modified = feed_validators(request, view_scopes)
+            response = conditional_response(
+                request, etag, last_modified,
+                lambda: view(request, *args, **kwargs)
+            )
+            if response.status_code in (200, 304):
+                patch_cache_control(
+                    response, public=True, max_age=0,
+                    s_maxage=settings.ANONYMOUS_CACHE_SECONDS,
+                )
+            return response
+        return wrapper
+    return decorator
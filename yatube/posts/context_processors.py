@@ -0,0 +1,9 @@
+from django.conf import settings
+
+
+def post_cache(request):
+    return {'post_cache_timeout': settings.POST_CACHE_TIMEOUT}
+
+
+def events(request):
+    return {'events_path': settings.EVENTS_PATH}
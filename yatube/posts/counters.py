@@ -0,0 +1,114 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, ProfileStats, User
+
+COUNTERS = {
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+    'posts_count': (Post, 'author'),
+}
+
+
+def bump(user_id, **deltas):
+    """
+    Сдвигаем счётчики пользователя одним UPDATE через F().
+
+    Строку не создаём: её заводит сигнал создания пользователя,
+    а потерянные строки восстанавливает reconcile().
+    """
+    bump_many([user_id], **deltas)
+
+
+def bump_many(user_ids, **deltas):
+    """
+    То же для нескольких пользователей одним UPDATE.
+    """
+    ProfileStats.objects.filter(user_id__in=user_ids).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=F('comment_count') + delta
+    )
+
+
+def actual_counts(users):
+    """
+    Аннотируем пользователей настоящими значениями счётчиков.
+    """
+    annotations = {}
+    for field, (model, lookup) in COUNTERS.items():
+        counts = model.objects.filter(**{lookup: OuterRef('pk')}).order_by()
+        counts = counts.values(lookup).annotate(total=Count('pk'))
+        annotations[f'actual_{field}'] = Coalesce(
+            Subquery(counts.values('total')), 0
+        )
+    return users.annotate(**annotations)
+
+
+def reconcile(users=None, batch_size=1000, fix=True):
+    """
+    Пересчитываем счётчики пачками по pk и чиним расхождения.
+
+    Возвращает число отсутствующих или неверных строк; при fix=True
+    создаёт и исправляет их.
+    """
+    if users is None:
+        users = User.objects.all()
+    users = actual_counts(users).order_by('pk')
+    fixed = 0
+    last_pk = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return fixed
+        last_pk = batch[-1].pk
+        stats = ProfileStats.objects.in_bulk([user.pk for user in batch])
+        to_create, to_update = [], []
+        for user in batch:
+            actual = {
+                field: getattr(user, f'actual_{field}') for field in COUNTERS
+            }
+            row = stats.get(user.pk)
+            if row is None:
+                to_create.append(ProfileStats(user=user, **actual))
+            elif any(getattr(row, field) != value
+                     for field, value in actual.items()):
+                for field, value in actual.items():
+                    setattr(row, field, value)
+                to_update.append(row)
+        if fix:
+            ProfileStats.objects.bulk_create(to_create)
+            ProfileStats.objects.bulk_update(to_update, list(COUNTERS))
+        fixed += len(to_create) + len(to_update)
+
+
+def reconcile_comment_counts(batch_size=1000, fix=True):
+    """
+    Сверяем Post.comment_count с таблицей комментариев пачками по pk.
+
+    Возвращает число постов с расхождением; при fix=True чинит их.
+    """
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by()
+    comments = comments.values('post').annotate(total=Count('pk'))
+    posts = Post.objects.annotate(
+        actual=Coalesce(Subquery(comments.values('total')), 0)
+    ).order_by('pk').only('pk', 'comment_count')
+    drifted = 0
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return drifted
+        last_pk = batch[-1].pk
+        for post in batch:
+            if post.comment_count == post.actual:
+                continue
+            drifted += 1
+            if fix:
+                Post.objects.filter(pk=post.pk).update(
+                    comment_count=post.actual
+                )
@@ -0,0 +1,81 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from yatube import routers
+
+from .models import Post
+
+VERSION_KEY = 'feed_version:{}'
+
+
+def version(scope):
+    """
+    Текущая версия области ленты; ключи фрагментов включают её.
+    """
+    key = VERSION_KEY.format(scope)
+    value = cache.get(key)
+    if value is None:
+        # Версия не должна повторяться после вытеснения из кеша,
+        # поэтому новая версия — текущее время, а не единица.
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    routers.check_version(value)
+    return value
+
+
+def invalidate(*scopes):
+    """
+    Новые версии областей. Внутри транзакции — только после коммита:
+    иначе параллельный запрос успеет закешировать старые строки
+    под новой версией.
+    """
+    transaction.on_commit(lambda: cache.set_many(
+        {VERSION_KEY.format(scope): time.time_ns() for scope in scopes},
+        None
+    ))
+
+
+def viewer_class(request):
+    if not request.user.is_authenticated:
+        return 'guest'
+    # В ленте есть кнопка «Редактировать» для своих постов
+    return f'user:{request.user.pk}'
+
+
+def feed_cache(request, *scopes):
+    """
+    Параметры {% cache %} для ленты: ключ из версий её областей,
+    страницы или курсора и класса зрителя.
+    """
+    scopes = scopes + ('groups',)
+    parts = [f'{scope}@{version(scope)}' for scope in scopes]
+    parts.append(request.GET.get('cursor') or request.GET.get('page') or '')
+    parts.append(viewer_class(request))
+    return {
+        'key': '|'.join(map(str, parts)),
+        'timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+
+
+def post_scopes(author_id, *group_ids):
+    scopes = ['posts', f'profile:{author_id}']
+    scopes.extend(f'group:{group_id}' for group_id in group_ids if group_id)
+    return scopes
+
+
+def post_changed(post):
+    invalidate(*post_scopes(
+        post.author_id, post.group_id, getattr(post, '_loaded_group_id', None)
+    ))
+
+
+def comment_changed(comment):
+    post = Post.objects.filter(pk=comment.post_id).values(
+        'author_id', 'group_id'
+    ).first()
+    if post is None:
+        # пост удалён вместе с комментариями, ленты сбросит его сигнал
+        return
+    invalidate(*post_scopes(post['author_id'], post['group_id']))
@@ -0,0 +1,118 @@
+"""
+Кеш графа подписок: для каждого пользователя — отсортированный массив
+id авторов, на которых он подписан.
+
+Массив хранится в кеше как байты array('I') (4 байта на подписку),
+загружается при первом обращении одним запросом и дальше отвечает на
+«подписан ли» и «на кого из этих авторов подписан» бинарным поиском,
+без запросов к базе.
+
+Ключ массива включает версию пользователя. Подписки и отписки не правят
+массив, а после коммита меняют версию (см. signals и follows), и
+следующее чтение загружает его заново. Откаченная подписка версию не
+трогает, а загрузка, прочитавшая базу до коммита, пишет старый массив
+под старой версией, которую уже никто не читает.
+"""
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from yatube import routers
+
+from .models import Follow
+
+KEY = 'following:{}:{}'
+VERSION_KEY = 'following_version:{}'
+
+
+class FollowingSet:
+    def __init__(self, author_ids):
+        self.author_ids = author_ids
+
+    def __contains__(self, author_id):
+        index = bisect_left(self.author_ids, author_id)
+        return (
+            index < len(self.author_ids)
+            and self.author_ids[index] == author_id
+        )
+
+    def __len__(self):
+        return len(self.author_ids)
+
+    def among(self, author_ids):
+        """
+        Те из author_ids, на кого пользователь подписан.
+        """
+        return {author_id for author_id in author_ids if author_id in self}
+
+
+def key(user_id):
+    """
+    Ключ массива по текущей версии подписок пользователя.
+    """
+    version_key = VERSION_KEY.format(user_id)
+    version = cache.get(version_key)
+    if version is None:
+        # как в feed_cache: после вытеснения версия не должна повториться
+        cache.add(version_key, time.time_ns(), None)
+        version = cache.get(version_key)
+    routers.check_version(version)
+    return KEY.format(user_id, version)
+
+
+def load(user_id, cache_key):
+    # cache_key получен до запроса: подписка, закоммиченная после него,
+    # сменит версию, и записанный здесь массив читать не станут
+    author_ids = array('I', Follow.objects.filter(
+        user_id=user_id
+    ).order_by('author_id').values_list('author_id', flat=True))
+    cache.set(cache_key, author_ids.tobytes(), settings.FOLLOW_GRAPH_TIMEOUT)
+    return author_ids
+
+
+def cached(cache_key):
+    """
+    Закешированный массив пользователя или None.
+    """
+    data = cache.get(cache_key)
+    if data is None:
+        return None
+    author_ids = array('I')
+    author_ids.frombytes(data)
+    return author_ids
+
+
+def following(user):
+    """
+    Подписки пользователя; в пределах объекта user грузятся один раз.
+    """
+    if not user.is_authenticated:
+        return FollowingSet(array('I'))
+    if not hasattr(user, '_following_set'):
+        cache_key = key(user.pk)
+        author_ids = cached(cache_key)
+        if author_ids is None:
+            author_ids = load(user.pk, cache_key)
+        user._following_set = FollowingSet(author_ids)
+    return user._following_set
+
+
+def is_following(user, author_id):
+    return author_id in following(user)
+
+
+def followed_among(user, author_ids):
+    return following(user).among(author_ids)
+
+
+def invalidate(*user_ids):
+    """
+    Меняем версии подписок пользователей после коммита транзакции.
+    """
+    transaction.on_commit(lambda: cache.set_many(
+        {VERSION_KEY.format(user_id): time.time_ns() for user_id in user_ids},
+        None
+    ))
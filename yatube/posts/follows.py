@@ -0,0 +1,146 @@
+"""
+Массовые подписки и отписки, например при переносе графа подписок
+из другой сети.
+
+Пользователи находятся одним запросом на пачку из FOLLOW_BATCH_SIZE
+имён, подписки вставляются bulk_create(ignore_conflicts=True) с опорой
+на ограничение unique_follow. Сигналы при этом не шлются, поэтому
+счётчики, ленты, граф подписок и версии кеша обновляются здесь же,
+пачкой на пачку.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from . import counters, feed_cache, follow_graph, timeline
+from .models import Follow, ProfileStats, User
+
+
+def batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def resolve(user, usernames):
+    """
+    {username: pk} найденных авторов без самого пользователя.
+    """
+    return dict(
+        User.objects.filter(username__in=usernames)
+        .exclude(pk=user.pk).values_list('username', 'pk')
+    )
+
+
+def missing(user, usernames, authors):
+    return [
+        name for name in usernames
+        if name not in authors and name != user.username
+    ]
+
+
+def lock(user):
+    """
+    Первой записью транзакции блокируем строку счётчиков пользователя.
+
+    Иначе два одновременных вызова для одного пользователя прочитают
+    одни и те же существующие подписки и оба увеличат счётчики и ленты:
+    в SQLite BEGIN не берёт блокировку до первой записи, а
+    select_for_update там ничего не делает. Пустой UPDATE берёт её
+    сразу, в других базах — блокирует строку.
+    """
+    ProfileStats.objects.filter(user=user).update(
+        following_count=F('following_count')
+    )
+
+
+def delete_follows(user, author_ids):
+    """
+    Удаляем подписки одним DELETE без сигнала post_delete на каждую
+    строку: всё, что он обновляет, вызывающий обновляет пачкой.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM {} WHERE {} = %s AND {} IN ({})'.format(
+                connection.ops.quote_name(Follow._meta.db_table),
+                connection.ops.quote_name(
+                    Follow._meta.get_field('user').column
+                ),
+                connection.ops.quote_name(
+                    Follow._meta.get_field('author').column
+                ),
+                ', '.join(['%s'] * len(author_ids)),
+            ),
+            [user.pk, *author_ids]
+        )
+
+
+def invalidate(user, author_ids):
+    feed_cache.invalidate(
+        f'follow:{user.pk}', f'stats:{user.pk}',
+        *(f'stats:{author_id}' for author_id in author_ids)
+    )
+
+
+@transaction.atomic
+def follow_many(user, usernames):
+    """
+    Подписывает user на авторов из usernames.
+
+    Возвращает число новых подписок, уже существовавших и список
+    неизвестных имён.
+    """
+    result = {'followed': 0, 'already': 0, 'missing': []}
+    usernames = list(dict.fromkeys(usernames))
+    lock(user)
+    for chunk in batches(usernames, settings.FOLLOW_BATCH_SIZE):
+        authors = resolve(user, chunk)
+        result['missing'].extend(missing(user, chunk, authors))
+        existing = set(
+            Follow.objects.filter(
+                user=user, author_id__in=authors.values()
+            ).values_list('author_id', flat=True)
+        )
+        new = [pk for pk in authors.values() if pk not in existing]
+        Follow.objects.bulk_create(
+            [Follow(user=user, author_id=author_id) for author_id in new],
+            ignore_conflicts=True,
+        )
+        if new:
+            counters.bump(user.pk, following_count=len(new))
+            counters.bump_many(new, followers_count=1)
+            timeline.follows_created(user.pk, new)
+            follow_graph.invalidate(user.pk)
+            invalidate(user, new)
+        result['followed'] += len(new)
+        result['already'] += len(existing)
+    return result
+
+
+@transaction.atomic
+def unfollow_many(user, usernames):
+    """
+    Отписывает user от авторов из usernames.
+
+    Возвращает число снятых подписок, авторов без подписки и список
+    неизвестных имён.
+    """
+    result = {'unfollowed': 0, 'not_following': 0, 'missing': []}
+    usernames = list(dict.fromkeys(usernames))
+    lock(user)
+    for chunk in batches(usernames, settings.FOLLOW_BATCH_SIZE):
+        authors = resolve(user, chunk)
+        result['missing'].extend(missing(user, chunk, authors))
+        follows = Follow.objects.filter(
+            user=user, author_id__in=authors.values()
+        )
+        removed = list(follows.values_list('author_id', flat=True))
+        if removed:
+            delete_follows(user, removed)
+            counters.bump(user.pk, following_count=-len(removed))
+            counters.bump_many(removed, followers_count=-1)
+            timeline.follows_deleted(user.pk, removed)
+            follow_graph.invalidate(user.pk)
+            invalidate(user, removed)
+        result['unfollowed'] += len(removed)
+        result['not_following'] += len(authors) - len(removed)
+    return result
@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {
+    'webp': 'image/webp',
+    'avif': 'image/avif',
+    'jpeg': 'image/jpeg',
+}
+
+
+def supported_formats():
+    """
+    Форматы из настроек, которые умеет сохранять установленный Pillow.
+
+    AVIF появляется, например, с пакетом pillow-avif-plugin.
+    """
+    Image.init()
+    return [fmt for fmt in settings.IMAGE_VARIANT_FORMATS
+            if fmt.upper() in Image.SAVE]
+
+
+def variant_name(name, width, fmt):
+    root, _ = os.path.splitext(name)
+    return f'{root}.w{width}.{fmt}'
+
+
+def save_variant(image, name, width, fmt):
+    """
+    Сохраняем вариант одной ширины и формата.
+    """
+    size = (width, round(width / settings.IMAGE_VARIANT_RATIO))
+    variant = ImageOps.fit(image, size, Image.LANCZOS)
+    buffer = BytesIO()
+    variant.save(buffer, fmt.upper(), quality=settings.IMAGE_VARIANT_QUALITY)
+    path = variant_name(name, width, fmt)
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def generate(name):
+    """
+    Режем оригинал под пропорции карточки и сохраняем рядом с ним
+    варианты всех ширин и форматов из настроек.
+
+    Формат, который не удалось сохранить, пропускается, остальные
+    остаются. Возвращает JSON с сохранёнными ширинами и форматами для
+    Post.image_sources: имена файлов из них восстанавливает variant_name.
+    """
+    with default_storage.open(name) as original:
+        image = Image.open(original)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info
+                              else 'RGB')
+    widths = settings.IMAGE_VARIANT_WIDTHS
+    formats = []
+    for fmt in supported_formats():
+        try:
+            for width in widths:
+                save_variant(image, name, width, fmt)
+        except Exception:
+            logger.exception('Не удалось сохранить %s в %s', name, fmt)
+            continue
+        formats.append(fmt)
+    return json.dumps({'widths': widths, 'formats': formats})
+
+
+def sources(post):
+    """
+    Источники для <picture> из Post.image_sources; пусто, пока их нет.
+    """
+    if not post.image_sources:
+        return []
+    saved = json.loads(post.image_sources)
+    return [
+        {
+            'type': MIME_TYPES.get(fmt, f'image/{fmt}'),
+            'srcset': ', '.join(
+                '{} {}w'.format(default_storage.url(
+                    variant_name(post.image.name, width, fmt)
+                ), width)
+                for width in saved['widths']
+            ),
+        }
+        for fmt in saved['formats']
+    ]
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import backfill_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Раскладывает по лентам подписчиков посты авторов, переставших '
+        'быть популярными; запускать по расписанию, например раз в минуту'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        authors = backfill_pending(batch_size=options['batch_size'])
+        self.stdout.write(f'Авторов разложено по лентам: {authors}')
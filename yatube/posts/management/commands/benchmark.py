@@ -0,0 +1,278 @@
+import asyncio
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import OperationalError, connection
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+# адрес не из INTERNAL_IPS, чтобы не включался debug_toolbar
+REMOTE_ADDR = '10.0.0.1'
+
+
+def percentile(values, share):
+    values = sorted(values)
+    index = min(len(values) - 1, round(share * (len(values) - 1)))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Гоняет ленты и страницу поста через тестовый клиент и печатает '
+        'p50/p95 задержки и число запросов к базе на запрос'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='очищать кеш перед каждым запросом'
+        )
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--concurrency', type=int, default=0,
+            help='сколько клиентов одновременно читают гостевые страницы; '
+                 'печатает пропускную способность выбранного --server'
+        )
+        parser.add_argument(
+            '--server', choices=['wsgi', 'asgi'], default='wsgi',
+            help='WSGI: поток на запрос; ASGI: yatube/asgi.py. В обоих '
+                 'случаях Django работает в ASGI_THREADS потоках'
+        )
+        parser.add_argument(
+            '--slow-client', type=float, default=0,
+            help='сколько секунд клиент принимает ответ'
+        )
+        parser.add_argument(
+            '--writers', type=int, default=0,
+            help='сколько потоков публикуют посты и комментарии, пока '
+                 'идёт нагрузка --concurrency'
+        )
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.cold = options['cold']
+        posts = list(
+            Post.objects.select_related('author')
+            .order_by('-pub_date')[:1000]
+        )
+        groups = list(Group.objects.values_list('slug', flat=True)[:1000])
+        readers = list(
+            User.objects.filter(follower__isnull=False).distinct()[:100]
+        )
+        if not posts or not groups or not readers:
+            raise CommandError(
+                'Нужны посты, группы и подписки: запустите generate_data'
+            )
+        guest = Client(REMOTE_ADDR=REMOTE_ADDR)
+        reader = Client(REMOTE_ADDR=REMOTE_ADDR)
+        targets = {
+            'index': (guest, lambda: reverse('posts:index')),
+            'group_posts': (guest, lambda: reverse(
+                'posts:group_posts', args=[random.choice(groups)]
+            )),
+            'profile': (guest, lambda: reverse(
+                'posts:profile', args=[random.choice(posts).author.username]
+            )),
+            'post_view': (guest, lambda: self.post_url(random.choice(posts))),
+            'follow_index': (reader, lambda: reverse('posts:follow_index')),
+        }
+        if options['concurrency']:
+            urls = [url for client, url in targets.values() if client is guest]
+            asyncio.run(self.load(urls, posts, options))
+            return
+
+        self.stdout.write(
+            f'{"view":<14}{"p50, ms":>10}{"p95, ms":>10}{"queries":>10}'
+        )
+        for name, (client, url) in targets.items():
+            timings, queries = [], []
+            for number in range(options['warmup'] + options['requests']):
+                if client is reader:
+                    client.force_login(random.choice(readers))
+                elapsed, count = self.measure(client, url())
+                if number >= options['warmup']:
+                    timings.append(elapsed)
+                    queries.append(count)
+            self.stdout.write(
+                f'{name:<14}'
+                f'{percentile(timings, 0.5) * 1000:>10.1f}'
+                f'{percentile(timings, 0.95) * 1000:>10.1f}'
+                f'{statistics.mean(queries):>10.1f}'
+            )
+
+    def post_url(self, post):
+        return reverse('posts:post', args=[post.author.username, post.id])
+
+    def measure(self, client, url):
+        if self.cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise CommandError(f'{url}: {response.status_code}')
+        return elapsed, len(context.captured_queries)
+
+    async def load(self, urls, posts, options):
+        """
+        Замкнутая нагрузка: concurrency клиентов шлют запросы один за другим.
+        Медленный клиент под WSGI держит поток до конца отдачи ответа,
+        под ASGI — только корутину. Параллельные writers показывают, как
+        чтение переносит запись в базу (см. DB_PROFILE).
+        """
+        if options['server'] == 'asgi':
+            # импорт поднимает пул потоков yatube/asgi.py
+            from yatube.asgi import application
+            pool = None
+            serve = self.asgi_client(application, options['slow_client'])
+        else:
+            pool = ThreadPoolExecutor(settings.ASGI_THREADS)
+            serve = self.wsgi_client(
+                pool, get_wsgi_application(), options['slow_client']
+            )
+        loop = asyncio.get_event_loop()
+        stop = threading.Event()
+        writer_pool = ThreadPoolExecutor(max(options['writers'], 1))
+        writers = [
+            loop.run_in_executor(writer_pool, self.write, posts, stop)
+            for _ in range(options['writers'])
+        ]
+        left = options['requests']
+        timings = []
+        errors = 0
+
+        async def client():
+            nonlocal left, errors
+            while left > 0:
+                left -= 1
+                url = random.choice(urls)()
+                started = time.perf_counter()
+                status = await serve(url)
+                timings.append(time.perf_counter() - started)
+                if status != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(
+                *(client() for _ in range(options['concurrency']))
+            )
+        finally:
+            elapsed = time.perf_counter() - started
+            stop.set()
+            written = await asyncio.gather(*writers)
+            writer_pool.shutdown()
+            if pool is not None:
+                pool.shutdown()
+
+        self.stdout.write(
+            f'{"server":<8}{"clients":>10}{"rps":>10}'
+            f'{"p50, ms":>10}{"p95, ms":>10}{"errors":>10}'
+            f'{"writes/s":>10}{"failed":>10}'
+        )
+        self.stdout.write(
+            f'{options["server"]:<8}{options["concurrency"]:>10}'
+            f'{len(timings) / elapsed:>10.1f}'
+            f'{percentile(timings, 0.5) * 1000:>10.1f}'
+            f'{percentile(timings, 0.95) * 1000:>10.1f}'
+            f'{errors:>10}'
+            f'{sum(done for done, failed in written) / elapsed:>10.1f}'
+            f'{sum(failed for done, failed in written):>10}'
+        )
+
+    def write(self, posts, stop):
+        """
+        Публикует посты и комментарии через представления, пока не stop.
+        """
+        client = Client(REMOTE_ADDR=REMOTE_ADDR)
+        logged_in = False
+        done = failed = 0
+        try:
+            while not stop.is_set():
+                post = random.choice(posts)
+                if random.random() < 0.5:
+                    url, data = reverse('posts:new_post'), {'text': 'пост'}
+                else:
+                    url = reverse('posts:add_comment', args=[
+                        post.author.username, post.id
+                    ])
+                    data = {'text': 'комментарий'}
+                try:
+                    # вход тоже пишет в базу и может упереться в блокировку
+                    if not logged_in:
+                        client.force_login(random.choice(posts).author)
+                        logged_in = True
+                    response = client.post(url, data)
+                except OperationalError:
+                    failed += 1
+                    continue
+                if response.status_code == 302:
+                    done += 1
+                else:
+                    failed += 1
+        finally:
+            connection.close()
+        return done, failed
+
+    def wsgi_client(self, pool, application, slow):
+        factory = RequestFactory(REMOTE_ADDR=REMOTE_ADDR)
+
+        def handle(url):
+            started = {}
+
+            def start_response(status, headers, exc_info=None):
+                started['status'] = int(status.split(' ', 1)[0])
+
+            result = application(factory.get(url).environ, start_response)
+            try:
+                for chunk in result:
+                    if chunk and slow:
+                        time.sleep(slow)
+            finally:
+                result.close()
+            return started['status']
+
+        async def serve(url):
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(pool, handle, url)
+
+        return serve
+
+    def asgi_client(self, application, slow):
+        async def serve(url):
+            parts = urlsplit(url)
+            scope = {
+                'type': 'http', 'method': 'GET', 'path': parts.path,
+                'query_string': parts.query.encode(), 'headers': [],
+                'client': (REMOTE_ADDR, 0),
+            }
+            started = {}
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    started['status'] = message['status']
+                elif message.get('body') and slow:
+                    await asyncio.sleep(slow)
+
+            await application(scope, receive, send)
+            return started['status']
+
+        return serve
@@ -0,0 +1,197 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import recommendations, search, timeline
+from posts.counters import reconcile, reconcile_comment_counts
+from posts.models import Comment, Follow, Group, Post, User
+
+
+def skewed(count):
+    """
+    Индекс 0..count-1 с вероятностью ~1/(индекс+1), как у закона Ципфа.
+    """
+    return min(int(count ** random.random()), count) - 1
+
+
+def free_numbers(model, field, template, count):
+    """
+    count номеров, для которых template.format(номер) ещё не занято
+    в поле field: команду можно запускать на непустой базе.
+    """
+    prefix = template.split('{')[0]
+    taken = set(model.objects.filter(
+        **{f'{field}__startswith': prefix}
+    ).values_list(field, flat=True))
+    number = 0
+    while count:
+        if template.format(number) not in taken:
+            yield number
+            count -= 1
+        number += 1
+
+
+@contextmanager
+def manual_dates(*fields):
+    """
+    Отключаем auto_now_add, чтобы bulk_create сохранил даты из прошлого.
+    """
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками с неравномерным распределением'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=300000)
+        parser.add_argument('--follows', type=int, default=200000)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--password', default='yatube',
+            help='общий пароль сгенерированных пользователей'
+        )
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+
+        self.create_users(options['users'], options['password'])
+        self.create_groups(options['groups'])
+        user_ids = self.ids(User)
+        group_ids = self.ids(Group)
+        self.create_posts(options['posts'], user_ids, group_ids)
+        self.create_comments(options['comments'], user_ids)
+        self.create_follows(options['follows'], user_ids)
+
+        self.stdout.write(
+            'Пересчитываем счётчики, ленты, поиск и рекомендации...'
+        )
+        reconcile(batch_size=self.batch_size)
+        reconcile_comment_counts(batch_size=self.batch_size)
+        timeline.rebuild(batch_size=self.batch_size)
+        search.rebuild()
+        recommendations.rebuild(batch_size=self.batch_size)
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def ids(self, model):
+        # после удалений в ключах есть дыры, поэтому не диапазон
+        return list(model.objects.order_by('pk').values_list('pk', flat=True))
+
+    def random_date(self):
+        return self.now - timedelta(seconds=random.random() * self.days
+                                    * 24 * 60 * 60)
+
+    def bulk(self, model, rows, total, **kwargs):
+        batch = []
+        created = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                model.objects.bulk_create(batch, **kwargs)
+                created += len(batch)
+                batch = []
+                self.stdout.write(
+                    f'{model.__name__}: {created}/{total}', ending='\r'
+                )
+        model.objects.bulk_create(batch, **kwargs)
+        created += len(batch)
+        self.stdout.write(f'{model.__name__}: {created}/{total}')
+
+    def create_users(self, count, password):
+        password = make_password(password)
+        self.bulk(User, (
+            User(username=f'user{number}', password=password)
+            for number in free_numbers(User, 'username', 'user{}', count)
+        ), count)
+
+    def create_groups(self, count):
+        self.bulk(Group, (
+            Group(
+                title=f'Группа {number}',
+                slug=f'group-{number}',
+                description=f'Описание группы {number}',
+            )
+            for number in free_numbers(Group, 'slug', 'group-{}', count)
+        ), count)
+
+    def create_posts(self, count, user_ids, group_ids):
+        """
+        Немногие авторы пишут большую часть постов; треть постов без группы.
+        """
+        def rows():
+            for number in range(count):
+                pub_date = self.random_date()
+                group_id = None
+                if group_ids and random.random() > 0.3:
+                    group_id = group_ids[skewed(len(group_ids))]
+                yield Post(
+                    text=f'Синтетический пост номер {number}. ' * 5,
+                    author_id=user_ids[skewed(len(user_ids))],
+                    group_id=group_id,
+                    pub_date=pub_date,
+                )
+
+        pub_date = Post._meta.get_field('pub_date')
+        with manual_dates(pub_date):
+            self.bulk(Post, rows(), count)
+
+    def create_comments(self, count, user_ids):
+        """
+        Больше всего комментариев у свежих постов; комментарий всегда
+        написан после поста.
+        """
+        posts = list(Post.objects.order_by('pub_date', 'pk').values_list(
+            'pk', 'pub_date'
+        ))
+        if not posts:
+            return
+
+        def rows():
+            for _ in range(count):
+                post_id, pub_date = posts[-1 - skewed(len(posts))]
+                yield Comment(
+                    post_id=post_id,
+                    author_id=random.choice(user_ids),
+                    text='Синтетический комментарий',
+                    created=pub_date + random.random() * (self.now - pub_date),
+                )
+
+        created = Comment._meta.get_field('created')
+        with manual_dates(created):
+            self.bulk(Comment, rows(), count)
+
+    def create_follows(self, count, user_ids):
+        """
+        Подписчики случайны, а авторы популярны по закону Ципфа.
+        """
+        if len(user_ids) < 2:
+            return
+
+        def rows():
+            for _ in range(count):
+                user_id = random.choice(user_ids)
+                author_id = user_ids[skewed(len(user_ids))]
+                if user_id != author_id:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        self.bulk(Follow, rows(), count, ignore_conflicts=True)
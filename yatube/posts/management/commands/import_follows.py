@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.follows import follow_many, unfollow_many
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Подписывает пользователя на авторов из файла с именами, по одному '
+        'в строке, например при переносе подписок из другой сети'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help='файл с именами или - для stdin')
+        parser.add_argument(
+            '--unfollow', action='store_true',
+            help='отписать от перечисленных авторов'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        if options['path'] == '-':
+            usernames = self.read(sys.stdin)
+        else:
+            with open(options['path'], encoding='utf-8') as source:
+                usernames = self.read(source)
+        action = unfollow_many if options['unfollow'] else follow_many
+        result = action(user, usernames)
+        for key, value in result.items():
+            if key == 'missing':
+                value = len(value)
+            self.stdout.write(f'{key}: {value}')
+        for name in result['missing']:
+            self.stderr.write(f'Не найден: {name}')
+
+    def read(self, source):
+        return [line.strip() for line in source if line.strip()]
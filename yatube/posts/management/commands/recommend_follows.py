@@ -0,0 +1,27 @@
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «Кого почитать» по графу подписок; '
+        'запускать по расписанию, например раз в сутки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rebuild(batch_size=options['batch_size'])
+        # ru_maxrss в Linux — в килобайтах
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.stdout.write(
+            f'Рекомендаций: {written}, '
+            f'за {time.perf_counter() - started:.1f} с, '
+            f'пик памяти процесса {peak / 1024:.0f} МБ'
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile, reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики подписчиков, подписок и записей авторов '
+        'и число комментариев у постов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--check', action='store_true',
+            help='только сообщить о расхождениях, ничего не исправлять'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fix = not options['check']
+        drifted = reconcile(batch_size=batch_size, fix=fix)
+        self.stdout.write(f'Авторов с неверными счётчиками: {drifted}')
+        drifted = reconcile_comment_counts(batch_size=batch_size, fix=fix)
+        self.stdout.write(f'Постов с неверным числом комментариев: {drifted}')
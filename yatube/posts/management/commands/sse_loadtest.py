@@ -0,0 +1,155 @@
+import asyncio
+import statistics
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+from posts.simple_socker import EventStream, hub
+
+CHANNEL_POST_ID = 0
+
+
+class FakeClient:
+    """
+    Клиент EventStream в том же процессе: ждёт отключения и считает события.
+    """
+
+    def __init__(self, received):
+        self.received = received
+        self.closed = asyncio.Event()
+
+    async def receive(self):
+        await self.closed.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message.get('body', b'').startswith(b'event:'):
+            self.received()
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест канала событий: держит много простаивающих '
+        'SSE-клиентов и меряет время рассылки события всем'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=2000)
+        parser.add_argument('--events', type=int, default=20)
+        parser.add_argument(
+            '--url', default=None,
+            help='адрес потока событий запущенного ASGI-сервера; без него '
+                 'клиенты подключаются к EventStream в этом процессе'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='сколько секунд держать соединения в режиме --url'
+        )
+
+    def handle(self, *args, **options):
+        if options['url']:
+            asyncio.run(self.over_network(
+                options['url'], options['connections'], options['duration']
+            ))
+        else:
+            asyncio.run(self.in_process(
+                options['connections'], options['events']
+            ))
+
+    async def in_process(self, count, events):
+        loop = asyncio.get_event_loop()
+        app = EventStream()
+        scope = {
+            'type': 'http', 'path': '/events/', 'headers': [],
+            'query_string': f'post={CHANNEL_POST_ID}'.encode(),
+        }
+        state = {'left': count, 'done': None}
+
+        def received():
+            state['left'] -= 1
+            if not state['left']:
+                state['done'].set_result(time.perf_counter())
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        clients = [FakeClient(received) for _ in range(count)]
+        tasks = [
+            asyncio.ensure_future(app(scope, client.receive, client.send))
+            for client in clients
+        ]
+        while hub.connections() < count:
+            await asyncio.sleep(0.01)
+        memory = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        timings = []
+        for number in range(events):
+            state['left'] = count
+            state['done'] = loop.create_future()
+            started = time.perf_counter()
+            # публикуем из другого потока, как это делает Django
+            await loop.run_in_executor(
+                None, hub.publish, f'post:{CHANNEL_POST_ID}', 'comment',
+                {'id': number, 'post': CHANNEL_POST_ID, 'author': 'loadtest'}
+            )
+            timings.append(await state['done'] - started)
+
+        for client in clients:
+            client.closed.set()
+        await asyncio.gather(*tasks)
+
+        timings.sort()
+        self.stdout.write(f'Соединений: {count}')
+        self.stdout.write(
+            f'Память на соединение: {memory / count / 1024:.1f} КБ'
+        )
+        self.stdout.write(
+            'Рассылка всем, мс: '
+            f'p50 {statistics.median(timings) * 1000:.1f}, '
+            f'p95 {timings[int(0.95 * (len(timings) - 1))] * 1000:.1f}, '
+            f'max {timings[-1] * 1000:.1f}'
+        )
+
+    async def over_network(self, url, count, duration):
+        parts = urlsplit(url)
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        request = (
+            f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+            'Accept: text/event-stream\r\n\r\n'
+        ).encode()
+        stats = {'connected': 0, 'failed': 0, 'events': 0}
+
+        async def client():
+            try:
+                reader, writer = await asyncio.open_connection(
+                    parts.hostname, parts.port or 80
+                )
+                writer.write(request)
+                status = await reader.readline()
+                if b' 200 ' not in status:
+                    raise ConnectionError(status)
+            except (OSError, ConnectionError):
+                stats['failed'] += 1
+                return
+            stats['connected'] += 1
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    if line.startswith(b'event:'):
+                        stats['events'] += 1
+            finally:
+                writer.close()
+
+        tasks = [asyncio.ensure_future(client()) for _ in range(count)]
+        await asyncio.wait(tasks, timeout=duration)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.stdout.write(
+            f'Подключено: {stats["connected"]}, ошибок: {stats["failed"]}, '
+            f'событий получено: {stats["events"]}'
+        )
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.6 on 2026-10-18 06:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    ProfileStats = apps.get_model('posts', 'ProfileStats')
+
+    def counts(model, field):
+        rows = model.objects.values(field).annotate(
+            total=models.Count('pk')
+        ).order_by()
+        return {row[field]: row['total'] for row in rows}
+
+    followers = counts(Follow, 'author')
+    following = counts(Follow, 'user')
+    posts = counts(Post, 'author')
+    ProfileStats.objects.bulk_create(
+        [
+            ProfileStats(
+                user_id=user_id,
+                followers_count=followers.get(user_id, 0),
+                following_count=following.get(user_id, 0),
+                posts_count=posts.get(user_id, 0),
+            )
+            for user_id in User.objects.values_list('pk', flat=True)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0004_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('followers_count', models.PositiveIntegerField(db_index=True, default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+CREATE_SQL = """
+    CREATE VIRTUAL TABLE posts_post_search USING fts5(
+        text, group_title, group_description,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+FILL_SQL = """
+    INSERT INTO posts_post_search (rowid, text, group_title, group_description)
+    SELECT post.id, post.text,
+           COALESCE(grp.title, ''), COALESCE(grp.description, '')
+    FROM posts_post AS post
+    LEFT JOIN posts_group AS grp ON grp.id = post.group_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [CREATE_SQL, FILL_SQL],
+            reverse_sql='DROP TABLE posts_post_search',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_recommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profilestats',
+            name='backfill_pending',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_comment_post_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='card_thumbnail',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
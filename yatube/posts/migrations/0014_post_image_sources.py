@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_card_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_sources',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -15,6 +15,33 @@ class Group(models.Model):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # прежние значения: по ним сигнал решает, что перерисовывать
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def changed(self, *fields):
+        """
+        Изменилось ли какое-то из полей с загрузки из базы.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return True
+        return any(
+            field not in loaded or getattr(self, field) != loaded[field]
+            for field in fields
+        )
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """
+        Всё, что нужно includes/post_item.html, одним запросом.
+        """
+        return self.select_related('author', 'group')
+
 
 class Post(models.Model):
     """
@@ -22,6 +49,7 @@ class Post(models.Model):
     """
     text = models.TextField(verbose_name='текст', help_text='напишите текст')
     pub_date = models.DateTimeField('date published', auto_now_add=True)
+    updated = models.DateTimeField('date updated', auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -36,13 +64,59 @@ class Post(models.Model):
         help_text='выберите группу'
     )
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    # имя готовой миниатюры карточки в хранилище (posts/thumbnails.py)
+    card_thumbnail = models.CharField(
+        max_length=255, blank=True, editable=False
+    )
+    # сохранённые варианты картинки в JSON (posts/image_variants.py)
+    image_sources = models.TextField(blank=True, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        # по индексу на каждую ленту: порядок совпадает с курсором
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        # группа из базы нужна, чтобы сбросить кеш ленты прежней группы
+        instance._loaded_group_id = loaded.get('group_id')
+        instance._loaded_image = loaded.get('image')
+        return instance
+
+    def save(self, *args, update_fields=None, **kwargs):
+        loaded = getattr(self, '_loaded_image', None)
+        if (self.card_thumbnail and loaded is not None
+                and self.image.name != loaded):
+            # миниатюра и варианты сделаны из прежней картинки
+            self.card_thumbnail = self.image_sources = ''
+            if update_fields is not None:
+                update_fields = {
+                    *update_fields, 'card_thumbnail', 'image_sources'
+                }
+        super().save(*args, update_fields=update_fields, **kwargs)
+        self._loaded_image = self.image.name
+
 
 class Comment(models.Model):
     """
@@ -66,6 +140,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -93,3 +173,93 @@ class Follow(models.Model):
 
     def __str__(self) -> str:
         return f'{self.user} подписан на {self.author}'
+
+
+class ProfileStats(models.Model):
+    """
+    Денормализованные счётчики для карточки автора.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    followers_count = models.PositiveIntegerField(default=0, db_index=True)
+    following_count = models.PositiveIntegerField(default=0)
+    posts_count = models.PositiveIntegerField(default=0)
+    # автор перестал быть популярным, а его посты ещё не разложены по
+    # лентам подписчиков: до тех пор они дочитываются при чтении
+    backfill_pending = models.BooleanField(default=False, db_index=True)
+
+    def __str__(self):
+        return f'Счётчики {self.user}'
+
+
+class TimelineEntry(models.Model):
+    """
+    Запись в материализованной ленте подписок пользователя.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField('date published')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.post} в ленте {self.user}'
+
+
+class Recommendation(models.Model):
+    """
+    Автор, на которого стоит подписаться пользователю; таблицу заново
+    заполняет posts/recommendations.py.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommended_to'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_recommendation'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'],
+                name='recommendation_user_score_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.author} для {self.user}'
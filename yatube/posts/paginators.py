@@ -0,0 +1,161 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+
+# первичные ключи SQLite — знаковые 64-битные целые
+MAX_PK = 2 ** 63 - 1
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(pub_date, pk, reverse=False):
+    """
+    Упаковываем позицию в ленте в непрозрачный токен для ?cursor=.
+    """
+    payload = {'d': pub_date.isoformat(), 'i': pk}
+    if reverse:
+        payload['r'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Распаковываем токен обратно в (pub_date, id, reverse).
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        pub_date = parse_datetime(payload['d'])
+        pk = int(payload['i'])
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor(token)
+    if pub_date is None or not 1 <= pk <= MAX_PK:
+        # иначе запрос упадёт с OverflowError
+        raise InvalidCursor(token)
+    return pub_date, pk, bool(payload.get('r'))
+
+
+class CursorPaginator(Paginator):
+    """
+    Keyset-пагинация по (pub_date, id) от новых к старым.
+
+    Не выполняет COUNT(*) и не использует OFFSET: каждая страница —
+    это выборка per_page + 1 строк от позиции, зашитой в курсор.
+    Поля ключа можно переопределить, если лента строится не по Post.
+
+    Возвращает обычный Page: номер страницы и num_pages считаются
+    относительно соседей (1–3), поэтому has_next/has_previous работают
+    как у Paginator, а ссылки берутся из next_cursor/previous_cursor.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page,
+                 date_field='pub_date', id_field='id', **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.date_field = date_field
+        self.id_field = id_field
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    @property
+    def num_pages(self):
+        return (
+            1 + (self.previous_cursor is not None)
+            + (self.next_cursor is not None)
+        )
+
+    def _key(self, obj):
+        return getattr(obj, self.date_field), getattr(obj, self.id_field)
+
+    def _after(self, pub_date, pk, reverse):
+        # (date, id) < (pub_date, pk) в виде диапазона по дате: так SQLite
+        # читает индекс (date, id) по порядку, без OR и без сортировки
+        range_op, tie_op = ('gte', 'lte') if reverse else ('lte', 'gte')
+        return (
+            Q(**{f'{self.date_field}__{range_op}': pub_date})
+            & ~Q(**{self.date_field: pub_date,
+                    f'{self.id_field}__{tie_op}': pk})
+        )
+
+    def page_queryset(self, cursor=None):
+        """
+        Запрос одной страницы: per_page + 1 строк от позиции курсора.
+        """
+        queryset = self.object_list
+        reverse = False
+        if cursor:
+            pub_date, pk, reverse = decode_cursor(cursor)
+            queryset = queryset.filter(self._after(pub_date, pk, reverse))
+        if reverse:
+            ordering = (self.date_field, self.id_field)
+        else:
+            ordering = (f'-{self.date_field}', f'-{self.id_field}')
+        return queryset.order_by(*ordering)[:self.per_page + 1], reverse
+
+    def page(self, cursor=None):
+        queryset, reverse = self.page_queryset(cursor)
+        rows = list(queryset)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        self.next_cursor = self.previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                self.next_cursor = encode_cursor(*self._key(rows[-1]))
+            if cursor and (has_more or not reverse):
+                self.previous_cursor = encode_cursor(
+                    *self._key(rows[0]), reverse=True
+                )
+        number = 1 + (self.previous_cursor is not None)
+        return self._get_page(rows, number, self)
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator для больших таблиц в админке: без точного COUNT(*).
+
+    Без фильтров число строк оценивается по максимальному pk, а
+    отфильтрованная выборка считается не дальше COUNT_LIMIT строк.
+    """
+    COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            last = queryset.model._default_manager.aggregate(last=Max('pk'))
+            return last['last'] or 0
+        return queryset.order_by()[:self.COUNT_LIMIT].count()
+
+
+def paginate(request, object_list, **kwargs):
+    """
+    Разбиваем ленту на страницы в режиме из settings.FEED_PAGINATION.
+
+    Явный ?page= обслуживается обычным Paginator, чтобы старые ссылки
+    продолжали работать.
+    """
+    if (settings.FEED_PAGINATION == 'cursor'
+            and 'page' not in request.GET):
+        paginator = CursorPaginator(
+            object_list, settings.POST_PER_PAGE, **kwargs
+        )
+        return paginator, paginator.get_page(request.GET.get('cursor'))
+    paginator = Paginator(object_list, settings.POST_PER_PAGE)
+    return paginator, paginator.get_page(request.GET.get('page'))
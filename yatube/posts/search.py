@@ -0,0 +1,129 @@
+"""
+Полнотекстовый поиск по постам на SQLite FTS5.
+
+Виртуальная таблица posts_post_search (см. миграцию 0009) хранит строку
+на пост с rowid = Post.id: текст поста, название и описание его группы.
+Сигналы обновляют её при сохранении и удалении постов и групп.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Post
+
+TABLE = 'posts_post_search'
+WORD = re.compile(r'\w+')
+
+# веса столбцов для bm25: text, group_title, group_description
+RANK = f'bm25({TABLE}, 1.0, 3.0, 1.0)'
+
+INSERT_SQL = f"""
+    INSERT INTO {TABLE} (rowid, text, group_title, group_description)
+    SELECT post.id, post.text,
+           COALESCE(grp.title, ''), COALESCE(grp.description, '')
+    FROM posts_post AS post
+    LEFT JOIN posts_group AS grp ON grp.id = post.group_id
+"""
+
+
+def _execute(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def remove_post(post_id):
+    _execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def index_post(post_id):
+    remove_post(post_id)
+    _execute(INSERT_SQL + ' WHERE post.id = %s', [post_id])
+
+
+def index_group(group_id):
+    """
+    Переиндексируем посты группы после смены её названия или описания.
+    """
+    _execute(
+        f'DELETE FROM {TABLE} WHERE rowid IN '
+        '(SELECT id FROM posts_post WHERE group_id = %s)', [group_id]
+    )
+    _execute(INSERT_SQL + ' WHERE post.group_id = %s', [group_id])
+
+
+def rebuild():
+    """
+    Строим индекс заново, например после bulk_create без сигналов.
+    """
+    _execute(f'DELETE FROM {TABLE}')
+    _execute(INSERT_SQL)
+    _execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+
+
+def match_expression(query):
+    """
+    Запрос пользователя в синтаксисе FTS5: все слова обязательны,
+    последнее ищется как префикс, операторы FTS5 не пропускаем.
+    """
+    terms = [f'"{word}"' for word in WORD.findall(query)]
+    if terms:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def post_ids(query):
+    """
+    id постов из SEARCH_MAX_RESULTS самых свежих совпадений с запросом.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return []
+    rows = _execute(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+        'ORDER BY rowid DESC LIMIT %s',
+        [expression, settings.SEARCH_MAX_RESULTS]
+    )
+    return [row[0] for row in rows]
+
+
+class SearchResults:
+    """
+    Ленивый список найденных постов для Paginator.
+
+    Берём не больше SEARCH_MAX_RESULTS самых свежих совпадений и
+    сортируем их по релевантности; страница — LIMIT/OFFSET по ним.
+    """
+
+    def __init__(self, query):
+        self.expression = match_expression(query)
+
+    def count(self):
+        if not self.expression:
+            return 0
+        rows = _execute(
+            f'SELECT count(*) FROM (SELECT 1 FROM {TABLE} '
+            f'WHERE {TABLE} MATCH %s LIMIT %s)',
+            [self.expression, settings.SEARCH_MAX_RESULTS]
+        )
+        return rows[0][0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not self.expression:
+            return []
+        # bm25 считаем только для свежих совпадений: FTS5 отдаёт их
+        # по rowid без сортировки, и время не растёт с размером таблицы
+        rows = _execute(
+            f'SELECT rowid FROM (SELECT rowid, {RANK} AS score FROM {TABLE} '
+            f'WHERE {TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s) '
+            'ORDER BY score, rowid DESC LIMIT %s OFFSET %s',
+            [self.expression, settings.SEARCH_MAX_RESULTS,
+             key.stop - key.start, key.start]
+        )
+        ids = [row[0] for row in rows]
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
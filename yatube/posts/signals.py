@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import (counters, feed_cache, follow_graph, search, simple_socker,
+               timeline)
+from .models import Comment, Follow, Group, Post, ProfileStats
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_profile_stats(sender, instance, created, **kwargs):
+    if created:
+        ProfileStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(instance.author_id, posts_count=1)
+        timeline.fan_out(instance)
+        transaction.on_commit(lambda: simple_socker.notify_post(instance))
+    search.index_post(instance.pk)
+    feed_cache.post_changed(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump(instance.author_id, posts_count=-1)
+    search.remove_post(instance.pk)
+    feed_cache.post_changed(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+        transaction.on_commit(
+            lambda: simple_socker.notify_comment(instance)
+        )
+    feed_cache.comment_changed(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    feed_cache.comment_changed(instance)
+
+
+def touch_group_posts(group_id):
+    """
+    Сдвигаем updated у постов группы пачками по POST_CACHE_BATCH_SIZE,
+    чтобы их закешированный HTML перерисовался.
+    """
+    posts = Post.objects.filter(group_id=group_id).order_by('pk')
+    now = timezone.now()
+    last = 0
+    while True:
+        batch = list(
+            posts.filter(pk__gt=last).values_list('pk', flat=True)
+            [:settings.POST_CACHE_BATCH_SIZE]
+        )
+        if not batch:
+            return
+        Post.objects.filter(pk__in=batch).update(updated=now)
+        last = batch[-1]
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if not created:
+        # в закешированный HTML постов входят название и адрес группы
+        if instance.changed('title', 'slug'):
+            touch_group_posts(instance.pk)
+        if instance.changed('title', 'description'):
+            search.index_group(instance.pk)
+    feed_cache.invalidate('groups')
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    feed_cache.invalidate('groups')
+
+
+def follow_scopes(follow):
+    return (
+        f'follow:{follow.user_id}',
+        f'stats:{follow.user_id}',
+        f'stats:{follow.author_id}',
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(instance.author_id, followers_count=1)
+        counters.bump(instance.user_id, following_count=1)
+        timeline.follow_created(instance.user_id, instance.author_id)
+        follow_graph.invalidate(instance.user_id)
+        feed_cache.invalidate(*follow_scopes(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump(instance.author_id, followers_count=-1)
+    counters.bump(instance.user_id, following_count=-1)
+    timeline.follow_deleted(instance.user_id, instance.author_id)
+    follow_graph.invalidate(instance.user_id)
+    feed_cache.invalidate(*follow_scopes(instance))
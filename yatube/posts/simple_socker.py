@@ -0,0 +1,254 @@
+"""
+Push-уведомления через Server-Sent Events поверх ASGI.
+
+Сигналы публикуют события в локальный pub/sub процесса (hub), а
+EventStream держит соединения /events/ как корутины: простаивающий
+клиент стоит воркеру пару килобайт, а не поток. Подключается в
+yatube/asgi.py, под WSGI канала нет.
+
+Каналы:
+    author:<id> — новый пост автора, его слушают подписчики;
+    post:<id>   — новый комментарий, его слушают открывшие пост (?post=).
+
+События доходят только до клиентов того же процесса; при нескольких
+воркерах нужен общий брокер, например Redis pub/sub.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from importlib import import_module
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http import HttpRequest
+from django.urls import reverse
+
+from .models import Follow
+
+
+PING = b': ping\n\n'
+
+
+def format_event(event, data):
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'event: {event}\ndata: {payload}\n\n'.encode()
+
+
+class Subscription:
+    """
+    Очередь одного клиента, привязанная к его циклу событий.
+    """
+
+    def __init__(self, loop, channels, maxsize):
+        self.loop = loop
+        self.channels = frozenset(channels)
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, message):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # медленный клиент не должен копить память воркера
+            self.dropped += 1
+
+    def close(self):
+        """
+        Будим отправителя пустым сообщением, даже если очередь полна.
+        """
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+def deliver(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.put(message)
+
+
+class Hub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = defaultdict(set)
+
+    def subscribe(self, channels, maxsize=0):
+        """
+        Вызывается из цикла событий клиента.
+        """
+        subscription = Subscription(
+            asyncio.get_event_loop(), channels, maxsize
+        )
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def publish(self, channel, event, data):
+        """
+        Потокобезопасно: вызывается из синхронного кода Django.
+        Возвращает число получателей.
+        """
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        if subscribers:
+            message = format_event(event, data)
+            # один вызов call_soon_threadsafe на цикл, а не на клиента
+            by_loop = defaultdict(list)
+            for subscription in subscribers:
+                by_loop[subscription.loop].append(subscription)
+            for loop, group in by_loop.items():
+                try:
+                    loop.call_soon_threadsafe(deliver, group, message)
+                except RuntimeError:
+                    # цикл уже закрыт, его клиенты отключились
+                    pass
+        return len(subscribers)
+
+    def subscriptions(self):
+        with self._lock:
+            return set().union(*self._channels.values())
+
+    def connections(self):
+        return len(self.subscriptions())
+
+
+hub = Hub()
+
+
+def notify_post(post):
+    hub.publish(f'author:{post.author_id}', 'post', {
+        'id': post.id,
+        'author': post.author.username,
+        'url': reverse('posts:post', args=[post.author.username, post.id]),
+    })
+
+
+def notify_comment(comment):
+    hub.publish(f'post:{comment.post_id}', 'comment', {
+        'id': comment.id,
+        'post': comment.post_id,
+        'author': comment.author.username,
+    })
+
+
+def session_user_id(scope):
+    """
+    id пользователя из сессионной куки запроса или None.
+
+    Пользователя находит get_user, как AuthenticationMiddleware: он
+    сверяет хеш сессии, и сессия, сброшенная сменой пароля, не подходит.
+    """
+    cookies = SimpleCookie()
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            cookies.load(value.decode('latin1'))
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    engine = import_module(settings.SESSION_ENGINE)
+    request = HttpRequest()
+    request.session = engine.SessionStore(morsel.value)
+    return get_user(request).pk
+
+
+def resolve_channels(scope):
+    """
+    Каналы клиента: ?post=<id> и авторы, на которых он подписан.
+    """
+    close_old_connections()
+    params = parse_qs(scope.get('query_string', b'').decode('latin1'))
+    channels = [
+        f'post:{post_id}' for post_id in params.get('post', [])
+        if post_id.isdigit()
+    ]
+    user_id = session_user_id(scope)
+    if user_id is not None:
+        authors = Follow.objects.filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True)
+        channels.extend(f'author:{author_id}' for author_id in authors)
+    return channels
+
+
+async def wait_disconnect(receive, subscription):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+    subscription.close()
+
+
+class EventStream:
+    """
+    ASGI-приложение для EVENTS_PATH: поток text/event-stream.
+
+    Сессия и подписки читаются из базы в executor, чтобы не блокировать
+    цикл событий. Раз в EVENTS_HEARTBEAT секунд одна общая задача шлёт
+    всем комментарий-пинг, чтобы прокси не закрывали простаивающие
+    соединения.
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self.heartbeat = None
+
+    async def ping(self, loop):
+        while True:
+            await asyncio.sleep(settings.EVENTS_HEARTBEAT)
+            deliver([
+                subscription for subscription in hub.subscriptions()
+                if subscription.loop is loop
+            ], PING)
+
+    async def __call__(self, scope, receive, send):
+        loop = asyncio.get_event_loop()
+        if self.heartbeat is None or self.heartbeat.get_loop() is not loop:
+            self.heartbeat = loop.create_task(self.ping(loop))
+        channels = await loop.run_in_executor(
+            self.executor, resolve_channels, scope
+        )
+        if not channels:
+            # 204 говорит EventSource не переподключаться
+            await send({'type': 'http.response.start', 'status': 204,
+                        'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        subscription = hub.subscribe(channels, settings.EVENTS_QUEUE_SIZE)
+        disconnected = loop.create_task(
+            wait_disconnect(receive, subscription)
+        )
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream; charset=utf-8'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            body = b': connected\n\n'
+            while body is not None:
+                await send({'type': 'http.response.body', 'body': body,
+                            'more_body': True})
+                body = await subscription.queue.get()
+        finally:
+            hub.unsubscribe(subscription)
+            disconnected.cancel()
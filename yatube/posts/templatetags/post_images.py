@@ -0,0 +1,28 @@
+from django import template
+
+from posts import image_variants, thumbnails
+
+register = template.Library()
+
+
+@register.filter
+def card_image(post):
+    """
+    Миниатюра карточки, а пока её нет — оригинал и задача в очереди.
+    """
+    url = thumbnails.card_url(post)
+    if url is None:
+        thumbnails.enqueue(post)
+        return post.image.url
+    return url
+
+
+@register.inclusion_tag('includes/card_picture.html')
+def card_picture(post):
+    """
+    <picture> с вариантами разных ширин и форматов для карточки поста.
+    """
+    return {
+        'src': card_image(post),
+        'sources': image_variants.sources(post),
+    }
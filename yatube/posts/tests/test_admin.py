@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import EstimatedCountPaginator
+
+
+class AdminChangeListTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.admin = User.objects.create_superuser(
+            username='админ', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Садоводы', slug='garden', description='Про огород'
+        )
+        for number in range(5):
+            author = User.objects.create_user(username=f'автор {number}')
+            post = Post.objects.create(
+                text=f'Заметка номер {number}', author=author,
+                group=cls.group,
+            )
+            Comment.objects.create(post=post, author=author, text='текст')
+            Follow.objects.create(user=author, author=cls.admin)
+
+    def setUp(self):
+        cache.clear()
+        self.admin_client = Client()
+        self.admin_client.force_login(AdminChangeListTests.admin)
+
+    def changelist(self, model, **params):
+        url = reverse(f'admin:posts_{model}_changelist')
+        with CaptureQueriesContext(connection) as context:
+            response = self.admin_client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, context.captured_queries
+
+    def test_changelists_without_full_count_and_row_lookups(self):
+        rows = {'post': 5, 'group': 1, 'comment': 5, 'follow': 5}
+        for model, count in rows.items():
+            with self.subTest(model=model):
+                response, queries = self.changelist(model)
+                self.assertEqual(
+                    len(response.context['cl'].result_list), count
+                )
+                sql = ' '.join(query['sql'] for query in queries)
+                self.assertNotIn('COUNT(*)', sql)
+                self.assertLess(len(queries), 10)
+
+    def test_post_search_uses_full_text_index(self):
+        response, queries = self.changelist('post', q='номер 3')
+        self.assertEqual(
+            [post.text for post in response.context['cl'].result_list],
+            ['Заметка номер 3']
+        )
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertIn('MATCH', sql)
+        self.assertNotIn('LIKE', sql)
+
+    def test_estimated_count(self):
+        posts = Post.objects.order_by('pk')
+        self.assertGreaterEqual(
+            EstimatedCountPaginator(posts, 2).count, posts.count()
+        )
+
+        class LimitedPaginator(EstimatedCountPaginator):
+            COUNT_LIMIT = 3
+
+        paginator = LimitedPaginator(posts.filter(group=self.group), 2)
+        self.assertEqual(paginator.count, 3)
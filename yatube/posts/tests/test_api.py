@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import on_commit_callbacks
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='тестовый автор')
+        cls.reader = User.objects.create_user(username='читатель')
+        cls.group = Group.objects.create(
+            title='тестовая группа', slug='testslug',
+            description='тестовое описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for number in range(3):
+            Post.objects.create(
+                text=f'текст {number}', author=cls.user, group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(FeedApiTests.reader)
+
+    def feeds(self):
+        return {
+            reverse('posts:api_index'): self.guest_client,
+            reverse('posts:api_group_posts', args=[self.group.slug]):
+                self.guest_client,
+            reverse('posts:api_profile', args=[self.user.username]):
+                self.guest_client,
+            reverse('posts:api_follow_index'): self.reader_client,
+        }
+
+    @override_settings(POST_PER_PAGE=2)
+    def test_feeds_paginated_by_cursor(self):
+        for url, client in self.feeds().items():
+            with self.subTest(url=url):
+                data = client.get(url).json()
+                texts = [post['text'] for post in data['results']]
+                self.assertEqual(texts, ['текст 2', 'текст 1'])
+                self.assertEqual(data['results'][0]['author'],
+                                 self.user.username)
+                self.assertEqual(data['results'][0]['group'],
+                                 self.group.slug)
+                data = client.get(url, {'cursor': data['next']}).json()
+                texts = [post['text'] for post in data['results']]
+                self.assertEqual(texts, ['текст 0'])
+                self.assertIsNone(data['next'])
+
+    def test_follow_feed_requires_login(self):
+        response = self.guest_client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_not_modified_until_feed_changes(self):
+        url = reverse('posts:api_index')
+        response = self.guest_client.get(url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+        with on_commit_callbacks():
+            Comment.objects.create(
+                author=self.reader, post=Post.objects.first(), text='коммент'
+            )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_detail(self):
+        post = Post.objects.first()
+        url = reverse('posts:api_post', args=[post.id])
+        response = self.guest_client.get(url)
+        self.assertEqual(response.json()['text'], post.text)
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+        post.text = 'новый текст'
+        post.save()
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.json()['text'], 'новый текст')
+
+        url = reverse('posts:api_post', args=[post.id + 100])
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
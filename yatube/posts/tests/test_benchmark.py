@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase
+from posts import counters
+from posts.models import (Comment, Follow, Group, Post, ProfileStats,
+                          TimelineEntry, User)
+
+
+def generate():
+    call_command(
+        'generate_data', users=30, groups=3, posts=200, comments=300,
+        follows=100, batch_size=50, seed=1, stdout=StringIO(),
+    )
+
+
+class GenerateDataTests(TestCase):
+    def generate(self):
+        generate()
+
+    def test_generate_data_counts(self):
+        self.generate()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertTrue(0 < Follow.objects.count() <= 100)
+
+    def test_generate_data_on_existing_database(self):
+        self.generate()
+        # дыры в ключах и занятые имена от прошлого запуска
+        User.objects.filter(username__in=['user3', 'user7']).delete()
+        Post.objects.filter(pk__in=Post.objects.values('pk')[:10]).delete()
+        self.generate()
+        self.assertEqual(User.objects.count(), 58)
+        self.assertEqual(Group.objects.count(), 6)
+        self.assertEqual(Comment.objects.filter(
+            post__pub_date__gt=F('created')
+        ).count(), 0)
+
+    def test_generate_data_consistent(self):
+        self.generate()
+        self.assertEqual(ProfileStats.objects.count(), 30)
+        self.assertEqual(counters.reconcile(fix=False), 0)
+        self.assertEqual(counters.reconcile_comment_counts(fix=False), 0)
+
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user_id).count(),
+            Post.objects.filter(
+                author__following__user=follow.user_id
+            ).count()
+        )
+
+    def test_benchmark_prints_table(self):
+        self.generate()
+        out = StringIO()
+        call_command('benchmark', requests=2, warmup=0, seed=1, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertIn('p95, ms', lines[0])
+        self.assertEqual(
+            [line.split()[0] for line in lines[1:]],
+            ['index', 'group_posts', 'profile', 'post_view', 'follow_index']
+        )
+
+
+class ConcurrentBenchmarkTests(TransactionTestCase):
+    """
+    Запросы выполняются в потоках пула, каждый со своим соединением.
+    """
+
+    def test_benchmark_compares_servers(self):
+        generate()
+        for server in ('wsgi', 'asgi'):
+            out = StringIO()
+            call_command(
+                'benchmark', requests=8, concurrency=4, server=server,
+                writers=1, seed=1, stdout=out
+            )
+            header, row = out.getvalue().splitlines()
+            self.assertIn('rps', header)
+            self.assertIn('writes/s', header)
+            self.assertEqual(row.split()[:2], [server, '4'])
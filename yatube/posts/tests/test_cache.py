@@ -1,9 +1,12 @@
-from collections import Counter
-
+from django.conf import settings
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
-from posts.models import Group, Post, User
+from posts import feed_cache
+from posts.models import Comment, Group, Post, User
+from posts.tests.utils import on_commit_callbacks
+from yatube.caches import FILE_MAX_ENTRIES, metrics, parse_cache_url
 
 
 class CacheTest(TestCase):
@@ -27,17 +30,203 @@ class CacheTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
+        self.authorized_client.force_login(CacheTest.user)
 
     def test_cache(self):
-        post_count = Post.objects.count()
-        auth_request = self.authorized_client.get(reverse('posts:index'))
-        Post.objects.create(text='тестовый текст', author=self.user)
-        self.assertEqual(Post.objects.count(), post_count + 1)
-        new_auth_request = self.authorized_client.get(reverse('posts:index'))
-        self.assertCountEqual(auth_request, new_auth_request)
+        """Фрагмент ленты берётся из кеша, пока данные не менялись."""
+        url = reverse('posts:index')
+        auth_request = self.authorized_client.get(url)
+        # update() не шлёт сигналов, поэтому фрагмент остаётся прежним
+        Post.objects.filter(pk=self.post.pk).update(text='невидимый текст')
+        new_auth_request = self.authorized_client.get(url)
+        self.assertEqual(auth_request.content, new_auth_request.content)
+        cache.clear()
+        last_auth_request = self.authorized_client.get(url)
+        self.assertContains(last_auth_request, 'невидимый текст')
+
+    def test_feeds_invalidated_by_signals(self):
+        """Запись, комментарий и группа сразу сбрасывают кеш лент."""
+        feeds = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+        for url in feeds:
+            self.guest_client.get(url)
+        with on_commit_callbacks():
+            post = Post.objects.create(
+                text='свежая запись', author=self.user, group=self.group
+            )
+        for url in feeds:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), post.text)
+        with on_commit_callbacks():
+            Comment.objects.create(post=post, author=self.user, text='к')
+        for url in feeds:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.guest_client.get(url), 'Комментариев: 1'
+                )
+        self.group.title = 'новое название'
+        with on_commit_callbacks():
+            self.group.save()
+        self.assertContains(
+            self.guest_client.get(feeds[0]), 'новое название'
+        )
+
+    def test_invalidated_after_commit(self):
+        """До коммита версия ленты прежняя: иначе под новой версией
+        закешируются старые строки."""
+        version = feed_cache.version('posts')
+        with on_commit_callbacks():
+            Post.objects.create(text='запись', author=self.user)
+            self.assertEqual(feed_cache.version('posts'), version)
+        self.assertNotEqual(feed_cache.version('posts'), version)
+
+    def test_moving_post_invalidates_old_group(self):
+        other_group = Group.objects.create(title='другая', slug='other')
+        url = reverse('posts:group_posts', kwargs={'slug': self.group.slug})
+        self.assertContains(self.guest_client.get(url), self.post.text)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = other_group
+        with on_commit_callbacks():
+            post.save()
+        self.assertNotContains(self.guest_client.get(url), self.post.text)
+
+    @override_settings(POST_CACHE_BATCH_SIZE=1)
+    def test_group_edit_touches_posts_only_for_rendered_fields(self):
+        Post.objects.create(text='второй', author=self.user, group=self.group)
+
+        def versions():
+            return list(
+                self.group.posts_group.order_by('pk')
+                .values_list('updated', flat=True)
+            )
+
+        before = versions()
+        group = Group.objects.get(pk=self.group.pk)
+        group.description = 'новое описание'
+        group.save()
+        self.assertEqual(versions(), before)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'новое название'
+        group.save()
+        after = versions()
+        self.assertTrue(all(new > old for new, old in zip(after, before)))
+
+    def test_pages_cached_separately(self):
+        for number in range(settings.POST_PER_PAGE):
+            Post.objects.create(text=f'запись {number}', author=self.user)
+        first_page = self.guest_client.get(reverse('posts:index'))
+        second_page = self.guest_client.get(
+            reverse('posts:index'), {'page': 2}
+        )
+        self.assertNotContains(first_page, 'тестовый текст')
+        self.assertContains(second_page, 'тестовый текст')
+
+
+class PostFragmentCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='тестовый автор')
+        cls.post = Post.objects.create(text='тестовый текст', author=cls.user)
+
+    def setUp(self):
         cache.clear()
-        last_auth_request = self.authorized_client.get(reverse('posts:index'))
-        self.assertNotEqual(
-            Counter(list(new_auth_request)), Counter(list(last_auth_request)))
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(PostFragmentCacheTest.user)
+
+    def test_fragment_shared_but_edit_button_per_viewer(self):
+        post_url = reverse('posts:post', kwargs={
+            'username': self.user.username, 'post_id': self.post.id
+        })
+        self.guest_client.get(post_url)
+        # меняем текст в обход сигналов и версии: фрагмент уже в кеше
+        Post.objects.filter(pk=self.post.pk).update(text='невидимый текст')
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'тестовый текст')
+        self.assertContains(response, 'Редактировать')
+        response = self.guest_client.get(post_url)
+        self.assertNotContains(response, 'Редактировать')
+
+    def test_edit_changes_fragment_version(self):
+        post_url = reverse('posts:post', kwargs={
+            'username': self.user.username, 'post_id': self.post.id
+        })
+        self.guest_client.get(post_url)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={
+                'username': self.user.username, 'post_id': self.post.id
+            }),
+            data={'text': 'исправленный текст'}
+        )
+        self.assertContains(
+            self.guest_client.get(post_url), 'исправленный текст'
+        )
+
+
+class CacheBackendTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.admin = User.objects.create_user(
+            username='админ', is_staff=True
+        )
+        Post.objects.create(text='тестовый текст', author=cls.admin)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.guest_client = Client()
+        self.admin_client = Client()
+        self.admin_client.force_login(CacheBackendTest.admin)
+
+    def test_parse_cache_url(self):
+        urls = {
+            'locmem://': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'file:///tmp/yatube': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': '/tmp/yatube',
+                'OPTIONS': {'MAX_ENTRIES': FILE_MAX_ENTRIES},
+            },
+            'memcached://127.0.0.1:11211': {
+                'BACKEND':
+                    'django.core.cache.backends.memcached.MemcachedCache',
+                'LOCATION': '127.0.0.1:11211',
+            },
+            'redis://127.0.0.1:6379/1': {
+                'BACKEND': 'django_redis.cache.RedisCache',
+                'LOCATION': 'redis://127.0.0.1:6379/1',
+            },
+        }
+        for url, config in urls.items():
+            with self.subTest(url=url):
+                self.assertEqual(parse_cache_url(url), config)
+        with self.assertRaises(ValueError):
+            parse_cache_url('ftp://example.com')
+
+    def test_tests_use_own_cache(self):
+        # cache.clear() в тестах не доходит до кеша сервера разработки
+        self.assertIsInstance(cache._cache, LocMemCache)
+
+    def test_feed_fragment_hits_and_misses_counted(self):
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(metrics.snapshot()['feed'], {'hits': 1, 'misses': 1})
+
+    def test_cache_stats_for_staff_only(self):
+        self.guest_client.get(reverse('posts:index'))
+        response = self.guest_client.get(reverse('posts:cache_stats'))
+        self.assertEqual(response.status_code, 302)
+        response = self.admin_client.get(reverse('posts:cache_stats'))
+        self.assertIn('feed', response.json()['groups'])
@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import on_commit_callbacks
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='тестовый автор')
+        cls.reader = User.objects.create_user(username='читатель')
+        cls.group = Group.objects.create(
+            title='тестовая группа', slug='testslug',
+            description='тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            text='тестовый текст', author=cls.user, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(ConditionalGetTests.reader)
+
+    def pages(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post', args=[self.user.username, self.post.id]),
+        ]
+
+    def revalidate(self, url, response):
+        return self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code
+
+    def test_guest_pages_not_modified(self):
+        # для 304 нужен только pk группы или автора, у главной — ничего
+        for url, queries in zip(self.pages(), (0, 1, 1, 1)):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn('s-maxage=60', response['Cache-Control'])
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+                with self.assertNumQueries(queries):
+                    status = self.revalidate(url, response)
+                self.assertEqual(status, 304)
+
+    def test_changes_invalidate_etag(self):
+        changes = [
+            lambda: Comment.objects.create(
+                author=self.reader, post=self.post, text='коммент'
+            ),
+            lambda: Group.objects.filter(pk=self.group.pk).first().save(),
+            lambda: Post.objects.create(
+                text='ещё', author=self.user, group=self.group
+            ),
+        ]
+        for change in changes:
+            responses = {url: self.guest_client.get(url)
+                         for url in self.pages()}
+            with on_commit_callbacks():
+                change()
+            for url, response in responses.items():
+                with self.subTest(url=url):
+                    self.assertEqual(self.revalidate(url, response), 200)
+
+    def test_follow_changes_author_card(self):
+        url = reverse('posts:profile', args=[self.user.username])
+        response = self.guest_client.get(url)
+        with on_commit_callbacks():
+            Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(self.revalidate(url, response), 200)
+
+    def test_user_pages_private(self):
+        for url in self.pages():
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertEqual(response['Cache-Control'], 'private')
+                self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,111 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Post, ProfileStats, User
+
+
+class ProfileStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='тестовый автор')
+        cls.reader = User.objects.create_user(username='читатель')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(ProfileStatsTests.reader)
+
+    def stats(self, user):
+        return ProfileStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        post = Post.objects.create(text='текст', author=self.author)
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author.username}
+        ))
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+
+        post.delete()
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_profile_shows_counters(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(reverse(
+            'posts:profile', kwargs={'username': self.author.username}
+        ))
+        self.assertContains(response, 'Подписчиков: 1')
+
+    def test_reconcile_command_fixes_drift(self):
+        Post.objects.create(text='текст', author=self.author)
+        ProfileStats.objects.filter(user=self.author).update(
+            posts_count=42, followers_count=7
+        )
+        ProfileStats.objects.filter(user=self.reader).delete()
+        out = StringIO()
+        call_command('reconcile_stats', stdout=out)
+        self.assertIn('Авторов с неверными счётчиками: 2', out.getvalue())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+
+
+class CommentCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='тестовый автор')
+        cls.post = Post.objects.create(text='текст', author=cls.user)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(CommentCountTests.user)
+
+    def test_add_comment_increments_count(self):
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={
+                'username': self.user.username, 'post_id': self.post.id
+            }),
+            data={'text': 'коммент'}
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        Comment.objects.get(post=self.post).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_post_edit_keeps_count(self):
+        Comment.objects.create(author=self.user, post=self.post, text='к')
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={
+                'username': self.user.username, 'post_id': self.post.id
+            }),
+            data={'text': 'новый текст'}
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'новый текст')
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_check_reports_drift_without_fixing(self):
+        Post.objects.filter(pk=self.post.pk).update(comment_count=5)
+        out = StringIO()
+        call_command('reconcile_stats', '--check', stdout=out)
+        self.assertIn(
+            'Постов с неверным числом комментариев: 1', out.getvalue()
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 5)
+        call_command('reconcile_stats', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
@@ -0,0 +1,266 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from posts import simple_socker
+from posts.models import Comment, Follow, Post, User
+from posts.simple_socker import EventStream, hub, resolve_channels
+from yatube.asgi import WsgiBridge, application, wsgi_environ
+
+
+class Connection:
+    """
+    Клиент ASGI-приложения: копит отправленное и отключается по команде.
+    """
+
+    def __init__(self, body=b''):
+        self.body = body
+        self.sent = []
+        self.disconnected = None
+
+    async def receive(self):
+        if self.body is not None:
+            body, self.body = self.body, None
+            return {'type': 'http.request', 'body': body}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def run(self, app, scope):
+        self.disconnected = asyncio.Event()
+        await app(scope, self.receive, self.send)
+
+    def chunks(self):
+        return b''.join(
+            message.get('body', b'') for message in self.sent
+            if message['type'] == 'http.response.body'
+        )
+
+
+def http_scope(path, query=b'', headers=()):
+    return {
+        'type': 'http', 'method': 'GET', 'path': path,
+        'query_string': query, 'headers': list(headers),
+    }
+
+
+class EventStreamTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='тестовый автор')
+        cls.reader = User.objects.create_user(username='читатель')
+        cls.post = Post.objects.create(text='текст', author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def listen(self, publish):
+        """
+        Подключаемся к посту, вызываем publish из другого потока и
+        отключаемся, когда событие дошло.
+        """
+        connection = Connection()
+        scope = http_scope(
+            settings.EVENTS_PATH, f'post={self.post.id}'.encode()
+        )
+
+        async def scenario():
+            task = asyncio.ensure_future(
+                connection.run(EventStream(), scope)
+            )
+            while not hub.connections():
+                await asyncio.sleep(0.01)
+            thread = threading.Thread(target=publish)
+            thread.start()
+            while b'event:' not in connection.chunks():
+                await asyncio.sleep(0.01)
+            thread.join()
+            connection.disconnected.set()
+            await task
+
+        asyncio.run(scenario())
+        self.assertEqual(hub.connections(), 0)
+        return connection
+
+    def test_comment_pushed_to_post_viewers(self):
+        comment = Comment.objects.create(
+            author=self.reader, post=self.post, text='коммент'
+        )
+        connection = self.listen(
+            lambda: simple_socker.notify_comment(comment)
+        )
+        start = connection.sent[0]
+        self.assertEqual(start['status'], 200)
+        self.assertIn(
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            start['headers']
+        )
+        self.assertIn(
+            'event: comment\ndata: {"id":%d,"post":%d,"author":"читатель"}'
+            % (comment.id, self.post.id),
+            connection.chunks().decode()
+        )
+
+    def test_no_channels_means_no_content(self):
+        connection = Connection()
+        asyncio.run(connection.run(
+            EventStream(), http_scope(settings.EVENTS_PATH)
+        ))
+        self.assertEqual(connection.sent[0]['status'], 204)
+
+    def test_followers_subscribed_to_authors(self):
+        client = Client()
+        client.force_login(self.reader)
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME]
+        scope = http_scope(
+            settings.EVENTS_PATH, b'post=5&post=x',
+            [(b'cookie', f'{cookie.key}={cookie.value}'.encode())]
+        )
+        self.assertEqual(
+            resolve_channels(scope), ['post:5', f'author:{self.author.id}']
+        )
+
+    def test_session_invalidated_by_password_change(self):
+        reader = User.objects.create_user(username='сменил пароль')
+        Follow.objects.create(user=reader, author=self.author)
+        client = Client()
+        client.force_login(reader)
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME]
+        scope = http_scope(
+            settings.EVENTS_PATH, b'',
+            [(b'cookie', f'{cookie.key}={cookie.value}'.encode())]
+        )
+        self.assertEqual(resolve_channels(scope), [f'author:{self.author.id}'])
+        reader.set_password('новый пароль')
+        reader.save()
+        self.assertEqual(resolve_channels(scope), [])
+
+    def test_slow_client_drops_events(self):
+        async def scenario():
+            subscription = hub.subscribe(['author:1'], maxsize=2)
+            for number in range(3):
+                hub.publish('author:1', 'post', {'id': number})
+            await asyncio.sleep(0)
+            hub.unsubscribe(subscription)
+            return subscription
+
+        subscription = asyncio.run(scenario())
+        self.assertEqual(subscription.queue.qsize(), 2)
+        self.assertEqual(subscription.dropped, 1)
+
+
+class AsgiBridgeTests(TestCase):
+    def test_wsgi_environ(self):
+        environ = wsgi_environ(http_scope(
+            '/путь/', b'a=1', [
+                (b'content-type', b'text/plain'),
+                (b'x-forwarded-for', b'1.1.1.1'),
+                (b'x-forwarded-for', b'2.2.2.2'),
+                (b'cookie', b'a=1'),
+                (b'cookie', b'sessionid=abc'),
+            ]
+        ), BytesIO(b'body'), 4)
+        self.assertEqual(
+            environ['PATH_INFO'], '/путь/'.encode().decode('latin1')
+        )
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_X_FORWARDED_FOR'], '1.1.1.1,2.2.2.2')
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; sessionid=abc')
+        self.assertEqual(environ['CONTENT_LENGTH'], '4')
+        self.assertEqual(environ['wsgi.input'].read(), b'body')
+
+    @override_settings(ASGI_MAX_BODY_SIZE=10)
+    def test_large_body_rejected(self):
+        headers = {
+            'declared': [(b'content-length', b'11')],
+            'streamed': [],
+        }
+        for name, scope_headers in headers.items():
+            with self.subTest(body=name):
+                connection = Connection(b'x' * 11)
+                scope = dict(http_scope('/new/', headers=scope_headers),
+                             method='POST')
+                asyncio.run(connection.run(application, scope))
+                self.assertEqual(connection.sent[0]['status'], 413)
+                # по Content-Length отказываем, не читая тела
+                self.assertEqual(
+                    connection.body is None, name == 'streamed'
+                )
+
+    def test_django_served_through_bridge(self):
+        connection = Connection()
+        asyncio.run(connection.run(
+            application, http_scope('/no/such/page/here/')
+        ))
+        self.assertEqual(connection.sent[0]['status'], 404)
+        self.assertIn('/no/such/page/here/', connection.chunks().decode())
+
+    def test_streaming_response_sent_as_produced(self):
+        connection = Connection()
+
+        class Streaming:
+            streaming = True
+            closed = False
+
+            def __iter__(self):
+                for chunk in (b'a', b'b'):
+                    # предыдущая часть уже у клиента
+                    yield chunk + str(len(connection.sent)).encode()
+
+            def close(self):
+                self.closed = True
+
+        result = Streaming()
+
+        def wsgi_application(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return result
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            asyncio.run(connection.run(
+                WsgiBridge(wsgi_application, executor), http_scope('/')
+            ))
+        self.assertEqual(connection.sent[0]['status'], 200)
+        self.assertEqual(connection.chunks(), b'a1b2')
+        self.assertTrue(result.closed)
+
+
+class AsgiUploadTests(TransactionTestCase):
+    """
+    Запрос выполняется в потоке пула со своим соединением с базой,
+    поэтому без общей транзакции теста.
+    """
+
+    def test_request_body_reaches_django(self):
+        client = Client()
+        client.force_login(User.objects.create_user(username='автор'))
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME]
+        token = 'a' * 32
+        for transfer in ('content-length', 'chunked'):
+            with self.subTest(transfer=transfer):
+                text = f'через мост, {transfer}'
+                body = f'text={text}&csrfmiddlewaretoken={token}'.encode()
+                headers = [
+                    (b'content-type', b'application/x-www-form-urlencoded'),
+                    # повторный Cookie, как его шлют HTTP/2-клиенты
+                    (b'cookie', f'{cookie.key}={cookie.value}'.encode()),
+                    (b'cookie',
+                     f'{settings.CSRF_COOKIE_NAME}={token}'.encode()),
+                ]
+                if transfer == 'content-length':
+                    headers.append(
+                        (b'content-length', str(len(body)).encode())
+                    )
+                scope = dict(http_scope('/new/', headers=headers),
+                             method='POST')
+                connection = Connection(body)
+                asyncio.run(connection.run(application, scope))
+                self.assertEqual(connection.sent[0]['status'], 302)
+                self.assertTrue(Post.objects.filter(text=text).exists())
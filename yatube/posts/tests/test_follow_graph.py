@@ -0,0 +1,110 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import follow_graph
+from posts.follows import follow_many
+from posts.models import Follow, User
+from posts.tests.utils import on_commit_callbacks
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.reader = User.objects.create_user(username='читатель')
+        cls.authors = [
+            User.objects.create_user(username=f'автор{number}')
+            for number in range(5)
+        ]
+        for author in cls.authors[::2]:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def fresh_reader(self):
+        # новый объект: в старом набор уже запомнен
+        return User.objects.get(pk=self.reader.pk)
+
+    def test_membership_in_memory(self):
+        ids = [author.pk for author in self.authors]
+        reader = self.fresh_reader()
+        with self.assertNumQueries(1):
+            self.assertTrue(follow_graph.is_following(reader, ids[0]))
+            self.assertFalse(follow_graph.is_following(reader, ids[1]))
+            self.assertEqual(
+                follow_graph.followed_among(reader, ids + [10 ** 6]),
+                {ids[0], ids[2], ids[4]}
+            )
+        # другой объект пользователя берёт массив из кеша
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                len(follow_graph.following(User(pk=self.reader.pk))), 3
+            )
+
+    def test_anonymous_follows_nobody(self):
+        response = Client().get(
+            reverse('posts:profile', args=[self.authors[0].username])
+        )
+        self.assertFalse(response.context['following'])
+
+    def test_updated_on_follow_and_unfollow(self):
+        author = self.authors[1]
+        follow_graph.following(self.fresh_reader())
+        with on_commit_callbacks():
+            self.client.get(reverse('posts:profile_follow', args=[author]))
+        self.assertTrue(
+            follow_graph.is_following(self.fresh_reader(), author.pk)
+        )
+        with on_commit_callbacks():
+            self.client.get(reverse('posts:profile_unfollow', args=[author]))
+        self.assertFalse(
+            follow_graph.is_following(self.fresh_reader(), author.pk)
+        )
+
+        with on_commit_callbacks():
+            follow_many(
+                self.reader, [author.username, self.authors[3].username]
+            )
+        self.assertEqual(
+            len(follow_graph.following(self.fresh_reader())), 5
+        )
+
+    def test_rolled_back_follow_not_cached(self):
+        author = self.authors[1]
+        follow_graph.following(self.fresh_reader())
+        with on_commit_callbacks():
+            try:
+                with transaction.atomic():
+                    Follow.objects.create(user=self.reader, author=author)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertFalse(
+            follow_graph.is_following(self.fresh_reader(), author.pk)
+        )
+
+    def test_load_started_before_commit_not_served(self):
+        author = self.authors[1]
+        stale_key = follow_graph.key(self.reader.pk)
+        with on_commit_callbacks():
+            Follow.objects.create(user=self.reader, author=author)
+        # загрузка, начатая до коммита, дописывает массив после него
+        cache.set(stale_key, b'', None)
+        self.assertTrue(
+            follow_graph.is_following(self.fresh_reader(), author.pk)
+        )
+
+    def test_profile_button(self):
+        follow_graph.following(self.fresh_reader())
+        for author, following in ((self.authors[0], True),
+                                  (self.authors[1], False)):
+            with self.subTest(author=author.username):
+                response = self.client.get(
+                    reverse('posts:profile', args=[author.username])
+                )
+                self.assertEqual(response.context['following'], following)
@@ -0,0 +1,140 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import counters, timeline
+from posts.follows import follow_many, unfollow_many
+from posts.models import Follow, Post, ProfileStats, TimelineEntry, User
+from posts.tests.utils import on_commit_callbacks
+
+
+@override_settings(FOLLOW_BATCH_SIZE=4)
+class BulkFollowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.reader = User.objects.create_user(username='читатель')
+        cls.authors = [
+            User.objects.create_user(username=f'автор{number}')
+            for number in range(6)
+        ]
+        for author in cls.authors:
+            Post.objects.create(text='текст', author=author)
+        cls.names = [author.username for author in cls.authors]
+
+    def test_follow_many(self):
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        result = follow_many(
+            self.reader, self.names + ['нет такого', 'читатель', 'автор1']
+        )
+        self.assertEqual(result, {
+            'followed': 5, 'already': 1, 'missing': ['нет такого'],
+        })
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader).count(), 6
+        )
+        self.assertEqual(counters.reconcile(fix=False), 0)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 6
+        )
+
+    def test_unfollow_many(self):
+        follow_many(self.reader, self.names)
+        result = unfollow_many(self.reader, self.names[:3] + ['нет такого'])
+        self.assertEqual(result, {
+            'unfollowed': 3, 'not_following': 0, 'missing': ['нет такого'],
+        })
+        self.assertEqual(counters.reconcile(fix=False), 0)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.reader
+            ).values_list('post__author__username', flat=True)),
+            set(self.names[3:])
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_crossing_fanout_limit(self):
+        popular, quiet = self.authors[:2]
+        fan = User.objects.create_user(username='поклонник')
+        Follow.objects.create(user=fan, author=popular)
+        timeline.popular_author_ids()
+
+        with on_commit_callbacks():
+            follow_many(self.reader, [popular.username, quiet.username])
+        # второй подписчик делает автора популярным: его посты
+        # дочитываются при чтении, а не раскладываются в ленту
+        self.assertIn(popular.pk, timeline.popular_author_ids())
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.reader
+            ).values_list('post__author', flat=True)),
+            {quiet.pk}
+        )
+
+        with on_commit_callbacks():
+            unfollow_many(fan, [popular.username])
+        self.assertTrue(
+            ProfileStats.objects.get(user=popular).backfill_pending
+        )
+        self.assertIn(popular.pk, timeline.popular_author_ids())
+        self.assertEqual(timeline.backfill_pending(), 1)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.reader
+            ).values_list('post__author', flat=True)),
+            {popular.pk, quiet.pk}
+        )
+        self.assertEqual(counters.reconcile(fix=False), 0)
+
+    @override_settings(FOLLOW_BATCH_SIZE=1000)
+    def test_queries_do_not_grow_with_authors(self):
+        def queries(user, names):
+            with CaptureQueriesContext(connection) as context:
+                follow_many(user, names)
+            return len(context.captured_queries)
+
+        first = User.objects.create_user(username='первый')
+        second = User.objects.create_user(username='второй')
+        self.assertEqual(
+            queries(first, self.names[:2]), queries(second, self.names)
+        )
+
+    def test_api(self):
+        client = Client()
+        url = reverse('posts:api_follow_bulk')
+        body = json.dumps({'usernames': self.names[:2]})
+        response = client.post(url, body, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+        client.force_login(self.reader)
+        response = client.post(url, body, content_type='application/json')
+        self.assertEqual(response.json()['followed'], 2)
+        response = client.post(
+            reverse('posts:api_unfollow_bulk'), body,
+            content_type='application/json'
+        )
+        self.assertEqual(response.json()['unfollowed'], 2)
+
+        response = client.post(url, '{"usernames": "автор1"}',
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(client.get(url).status_code, 405)
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.txt', delete=False, encoding='utf-8'
+        ) as source:
+            source.write('\n'.join(self.names + ['', 'нет такого']))
+        self.addCleanup(os.remove, source.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_follows', 'читатель', source.name,
+                     stdout=out, stderr=err)
+        self.assertIn('followed: 6', out.getvalue())
+        self.assertIn('нет такого', err.getvalue())
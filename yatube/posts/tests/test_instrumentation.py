@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post, User
+from yatube.instrumentation import TIME_BUCKETS, Histogram, request_metrics
+
+
+class HistogramTest(TestCase):
+    def test_percentiles_are_bucket_bounds(self):
+        histogram = Histogram(TIME_BUCKETS)
+        for value in [0.5] * 90 + [30] * 9 + [9000]:
+            histogram.add(value)
+        stats = histogram.as_dict()
+        self.assertEqual(stats['count'], 100)
+        self.assertEqual(stats['p50'], 1)
+        self.assertEqual(stats['p95'], 50)
+        self.assertEqual(stats['max'], 9000)
+        self.assertEqual(stats['buckets']['inf'], 1)
+
+
+class RequestMetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.admin = User.objects.create_user(
+            username='админ', is_staff=True
+        )
+        Post.objects.create(text='тестовый текст', author=cls.admin)
+
+    def setUp(self):
+        cache.clear()
+        request_metrics.reset()
+        self.guest_client = Client()
+        self.admin_client = Client()
+        self.admin_client.force_login(RequestMetricsTest.admin)
+
+    def test_request_recorded_by_url_name(self):
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(reverse('posts:index'))
+        index = request_metrics.snapshot()['posts:index']
+        self.assertEqual(index['wall_ms']['count'], 2)
+        self.assertEqual(index['queries']['max'], 1)
+        self.assertGreater(index['cache_misses']['mean'], 0)
+        self.assertGreater(index['cache_hits']['mean'], 0)
+        self.assertGreater(index['template_ms']['mean'], 0)
+        self.assertLessEqual(
+            index['db_ms']['mean'], index['wall_ms']['mean']
+        )
+
+    def test_request_stats_for_staff_only(self):
+        self.guest_client.get(reverse('posts:index'))
+        response = self.guest_client.get(reverse('posts:request_stats'))
+        self.assertEqual(response.status_code, 302)
+        response = self.admin_client.get(reverse('posts:request_stats'))
+        self.assertIn('posts:index', response.json()['views'])
+
+    def test_snapshot_written_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'requests.log')
+            with override_settings(REQUEST_METRICS_FILE=path,
+                                   REQUEST_METRICS_INTERVAL=0):
+                self.guest_client.get(reverse('posts:index'))
+            with open(path) as log:
+                snapshot = json.loads(log.readlines()[-1])
+        self.assertIn('posts:index', snapshot['views'])
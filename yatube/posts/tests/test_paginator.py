@@ -1,6 +1,10 @@
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from posts.models import Post, User
+from posts.paginators import encode_cursor
 
 
 class PaginatorTests(TestCase):
@@ -23,3 +27,57 @@ class PaginatorTests(TestCase):
     def test_paginator(self):
         response = self.guest_client.get(reverse('posts:index'))
         self.assertEqual(len(response.context.get('page').object_list), 10)
+
+    def test_cursor_pages_cover_feed(self):
+        """Курсорные страницы проходят ленту без пропусков и повторов."""
+        response = self.guest_client.get(reverse('posts:index'))
+        first_page = response.context.get('page')
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+        next_cursor = first_page.paginator.next_cursor
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': next_cursor}
+        )
+        second_page = response.context.get('page')
+        self.assertEqual(len(second_page.object_list), 4)
+        self.assertFalse(second_page.has_next())
+        seen = list(first_page.object_list) + list(second_page.object_list)
+        self.assertEqual(
+            seen, list(Post.objects.order_by('-pub_date', '-id'))
+        )
+        previous_cursor = second_page.paginator.previous_cursor
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context.get('page').object_list),
+            list(first_page.object_list)
+        )
+
+    def test_cursor_page_skips_count(self):
+        """Курсорная страница не выполняет COUNT(*)."""
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse('posts:index'))
+        sql = [query['sql'] for query in queries.captured_queries]
+        self.assertFalse(any('COUNT(*)' in query for query in sql))
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': 'мусор'}
+        )
+        self.assertEqual(len(response.context.get('page').object_list), 10)
+
+    def test_out_of_range_cursor_returns_first_page(self):
+        for pk in (2 ** 63, -1):
+            with self.subTest(pk=pk):
+                response = self.guest_client.get(
+                    reverse('posts:index'),
+                    {'cursor': encode_cursor(timezone.now(), pk)}
+                )
+                self.assertEqual(
+                    len(response.context.get('page').object_list), 10
+                )
+
+    def test_page_number_still_supported(self):
+        response = self.guest_client.get(reverse('posts:index'), {'page': 2})
+        self.assertEqual(len(response.context.get('page').object_list), 4)
@@ -0,0 +1,116 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import CursorPaginator, encode_cursor
+from posts.timeline import timeline_posts
+
+
+def query_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def bad_steps(plan):
+    """
+    Полный просмотр таблицы без индекса или сортировка во временном B-tree.
+    """
+    return [
+        step for step in plan
+        if 'TEMP B-TREE' in step
+        or (step.startswith('SCAN') and 'USING' not in step)
+    ]
+
+
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN для запросов лент и комментариев из posts.views.
+
+    Тест падает, если какой-то путь доступа потерял свой индекс.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.authors = [
+            User.objects.create_user(username=f'автор{number}')
+            for number in range(5)
+        ]
+        cls.reader = User.objects.create_user(username='читатель')
+        cls.group = Group.objects.create(
+            title='тестовая группа', slug='testslug', description='описание'
+        )
+        for author in cls.authors[:3]:
+            Follow.objects.create(user=cls.reader, author=author)
+        posts = [
+            Post(text=f'текст {number}', author=cls.authors[number % 5],
+                 group=cls.group if number % 2 else None)
+            for number in range(200)
+        ]
+        Post.objects.bulk_create(posts)
+        cls.post = Post.objects.first()
+        Comment.objects.bulk_create(
+            Comment(post=post, author=cls.reader, text='коммент')
+            for post in Post.objects.all()[:50]
+        )
+        # bulk_create не шлёт сигналов: заполняем ленту подпиской
+        for author in cls.authors[:3]:
+            Follow.objects.filter(user=cls.reader, author=author).delete()
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def feed_queries(self):
+        cursor = encode_cursor(self.post.pub_date, self.post.pk)
+        back = encode_cursor(self.post.pub_date, self.post.pk, reverse=True)
+        follow_posts, cursor_fields = timeline_posts(self.reader)
+        feeds = {
+            'index': (Post.objects.for_feed(), {}),
+            'group': (self.group.posts_group.for_feed(), {}),
+            'profile': (self.authors[0].posts.for_feed(), {}),
+            'follow': (follow_posts, cursor_fields),
+        }
+        for name, (queryset, fields) in feeds.items():
+            paginator = CursorPaginator(queryset, 10, **fields)
+            yield name, paginator.page_queryset()[0]
+            yield f'{name} cursor', paginator.page_queryset(cursor)[0]
+            yield f'{name} back', paginator.page_queryset(back)[0]
+        # как в post_view и post_comments: порядок (-created, -id)
+        comments = self.post.comments.select_related('author')
+        comment = comments.first()
+        yield 'comments', comments.order_by('-created', '-id')[:10]
+        paginator = CursorPaginator(comments, 10, date_field='created')
+        yield 'comments cursor', paginator.page_queryset(
+            encode_cursor(comment.created, comment.pk)
+        )[0]
+
+    def test_feed_queries_use_indexes(self):
+        for name, queryset in self.feed_queries():
+            plan = query_plan(queryset)
+            with self.subTest(query=name, plan=plan):
+                self.assertEqual(bad_steps(plan), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_follow_feed_with_popular_authors(self):
+        """
+        Посты популярных авторов подмешиваются к TimelineEntry через OR.
+
+        Обе ветви идут по индексам, но их объединение SQLite сортирует
+        во временном B-tree: эту сортировку мы принимаем (см.
+        timeline_posts), а полный просмотр таблицы — нет.
+        """
+        follow_posts, cursor_fields = timeline_posts(self.reader)
+        self.assertEqual(cursor_fields, {})
+        paginator = CursorPaginator(follow_posts, 10)
+        cursor = encode_cursor(self.post.pub_date, self.post.pk)
+        for name, page_cursor in (('first', None), ('cursor', cursor)):
+            plan = query_plan(paginator.page_queryset(page_cursor)[0])
+            with self.subTest(page=name, plan=plan):
+                self.assertIn('MULTI-INDEX OR', plan)
+                self.assertEqual(
+                    bad_steps(plan), ['USE TEMP B-TREE FOR ORDER BY']
+                )
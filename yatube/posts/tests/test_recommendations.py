@@ -0,0 +1,119 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import feed_cache, recommendations
+from posts.models import Follow, Recommendation, User
+from posts.recommendations import Adjacency
+from posts.tests.utils import on_commit_callbacks
+
+
+class AdjacencyTests(TestCase):
+    def test_rows(self):
+        matrix = Adjacency([(2, 5), (2, 7), (4, 1)])
+        self.assertEqual(list(matrix.row(2)), [5, 7])
+        self.assertEqual(list(matrix.row(4)), [1])
+        self.assertEqual(list(matrix.row(0)), [])
+        self.assertEqual(list(matrix.row(100)), [])
+        self.assertEqual(list(matrix.rows()), [2, 4])
+        self.assertEqual(list(Adjacency([]).rows()), [])
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        names = ['читатель', 'a', 'b', 'c', 'd', 'e', 'v']
+        cls.users = {
+            name: User.objects.create_user(username=name) for name in names
+        }
+        for user, author in [
+            ('читатель', 'a'), ('читатель', 'b'),
+            ('a', 'c'), ('a', 'd'), ('a', 'b'), ('a', 'читатель'),
+            ('b', 'c'),
+            ('v', 'a'), ('v', 'e'),
+        ]:
+            Follow.objects.create(
+                user=cls.users[user], author=cls.users[author]
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.reader = self.users['читатель']
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def scores(self, user):
+        return list(
+            Recommendation.objects.filter(user=user).order_by('-score')
+            .values_list('author__username', 'score')
+        )
+
+    def test_friends_of_friends_and_cofollows(self):
+        Recommendation.objects.create(
+            user=self.reader, author=self.users['v'], score=100
+        )
+        recommendations.rebuild(batch_size=2)
+        # c: на него подписаны оба автора читателя, d — один из них;
+        # соподписки: подписчик b (это a) читает c и d, подписчик a — e
+        self.assertEqual(
+            self.scores(self.reader), [('c', 2.5), ('d', 1.5), ('e', 0.5)]
+        )
+        self.assertFalse(Recommendation.objects.filter(
+            user=self.users['c']
+        ).exists())
+
+    def test_cached_until_rebuild(self):
+        recommendations.rebuild()
+        recommendations.for_user(self.reader)
+        # в кеше только id, сами пользователи — одним запросом
+        self.assertEqual(
+            cache.get(recommendations.CACHE_KEY.format(
+                self.reader.pk, feed_cache.version('recommendations')
+            )),
+            [self.users[name].pk for name in 'cde']
+        )
+        with self.assertNumQueries(1):
+            authors = recommendations.for_user(User(pk=self.reader.pk))
+        self.assertEqual([author.username for author in authors],
+                         ['c', 'd', 'e'])
+        with on_commit_callbacks():
+            recommendations.rebuild()
+        # новая версия таблицы: выборка рекомендаций и пользователей
+        with self.assertNumQueries(2):
+            recommendations.for_user(User(pk=self.reader.pk))
+
+    def test_shown_on_follow_index_and_profile(self):
+        call_command('recommend_follows', stdout=StringIO())
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [author.username for author in response.context[
+                'recommendations'
+            ]],
+            ['c', 'd', 'e']
+        )
+        self.assertContains(response, 'Кого почитать')
+
+        response = self.client.get(reverse('posts:profile', args=['c']))
+        self.assertEqual(
+            [author.username for author in response.context[
+                'recommendations'
+            ]],
+            ['d', 'e']
+        )
+
+        with on_commit_callbacks():
+            self.client.get(reverse('posts:profile_follow', args=['d']))
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertNotIn(
+            self.users['d'], response.context['recommendations']
+        )
+        self.assertEqual(
+            Client().get(reverse('posts:profile', args=['c'])).context[
+                'recommendations'
+            ],
+            []
+        )
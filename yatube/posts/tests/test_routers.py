@@ -0,0 +1,141 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (RequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+from posts import follow_graph
+from posts.models import Follow, Post, User
+from yatube.routers import (STICKY_COOKIE, ReplicaRouter,
+                            ReplicaRoutingMiddleware, replica_reads)
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='автор')
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def serve(self, view, request):
+        """
+        Прогоняет представление через middleware и запоминает, из какой
+        базы оно прочитало бы посты.
+        """
+        used = []
+
+        @replica_reads
+        def routed(request):
+            used.append(self.router.db_for_read(Post))
+            view(request)
+            used.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(routed)(request)
+        return response, used
+
+    def test_reads_go_to_replica_only_in_opted_in_views(self):
+        response, used = self.serve(lambda request: None,
+                                    self.factory.get('/'))
+        self.assertEqual(used, ['replica1', 'replica1'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    @override_settings(REPLICA_DATABASES=['replica1', 'replica2', 'replica3'])
+    def test_one_replica_per_request(self):
+        def read(request):
+            used.extend(self.router.db_for_read(Post) for _ in range(20))
+
+        for _ in range(5):
+            used = []
+            self.serve(read, self.factory.get('/'))
+            with self.subTest(used=used):
+                self.assertEqual(len(set(used)), 1)
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_read_your_writes(self):
+        def write(request):
+            Post.objects.create(text='пост', author=self.author)
+
+        response, used = self.serve(write, self.factory.post('/new/'))
+        self.assertEqual(used, ['replica1', 'default'])
+        cookie = response.cookies[STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], 10)
+
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = cookie.value
+        response, used = self.serve(lambda request: None, request)
+        self.assertEqual(used, ['default', 'default'])
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_without_replicas_nothing_changes(self):
+        def write(request):
+            Post.objects.create(text='пост', author=self.author)
+
+        response, used = self.serve(write, self.factory.post('/new/'))
+        self.assertEqual(used, [None, None])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+
+@override_settings(REPLICA_DATABASES=['lagging'])
+class LaggingReplicaTests(TransactionTestCase):
+    """
+    Реплика — файл SQLite, снятый с основной базы до записи и больше
+    не обновлявшийся.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='автор')
+        self.reader = User.objects.create_user(username='читатель')
+        Post.objects.create(text='старый пост', author=self.author)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'replica.sqlite3')
+        primary = connections['default']
+        primary.ensure_connection()
+        replica = sqlite3.connect(path)
+        primary.connection.backup(replica)
+        replica.close()
+        connections.databases['lagging'] = dict(
+            primary.settings_dict, NAME=path, TEST={}
+        )
+        self.addCleanup(self.drop_replica)
+
+        Post.objects.create(text='новый пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def drop_replica(self):
+        connections['lagging'].close()
+        del connections.databases['lagging']
+        delattr(connections._connections, 'lagging')
+
+    def test_fresh_versions_read_from_primary(self):
+        # второй ответ — из кеша фрагментов под той же версией
+        for _ in range(2):
+            response = self.client.get('/')
+            self.assertContains(response, 'новый пост')
+
+        @replica_reads
+        def view(request):
+            return follow_graph.is_following(self.reader, self.author.pk)
+
+        self.assertTrue(view(RequestFactory().get('/')))
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_settled_versions_read_from_replica(self):
+        response = self.client.get('/')
+        self.assertContains(response, 'старый пост')
+        self.assertNotContains(response, 'новый пост')
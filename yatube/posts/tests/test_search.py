@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import search
+from posts.models import Group, Post, User
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='тестовый автор')
+        cls.group = Group.objects.create(
+            title='Садоводы', slug='garden', description='Про огород'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def found(self, query, **params):
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [post.text for post in response.context['page']]
+
+    def test_match_expression(self):
+        self.assertEqual(search.match_expression(''), '')
+        self.assertEqual(
+            search.match_expression('кот OR "пёс*'), '"кот" "OR" "пёс"*'
+        )
+
+    def test_index_follows_post_changes(self):
+        post = Post.objects.create(text='Рыжий кот спит', author=self.user)
+        self.assertEqual(self.found('рыжий'), ['Рыжий кот спит'])
+        self.assertEqual(self.found('кот сп'), ['Рыжий кот спит'])
+
+        post.text = 'Чёрный пёс лает'
+        post.save()
+        self.assertEqual(self.found('кот'), [])
+        self.assertEqual(self.found('пёс'), ['Чёрный пёс лает'])
+
+        post.delete()
+        self.assertEqual(self.found('пёс'), [])
+
+    def test_group_fields_indexed_and_ranked(self):
+        Post.objects.create(text='Садоводы любят лето', author=self.user)
+        Post.objects.create(
+            text='Урожай', author=self.user, group=self.group
+        )
+        self.assertEqual(
+            self.found('садоводы'), ['Урожай', 'Садоводы любят лето']
+        )
+
+        self.group.title = 'Огородники'
+        self.group.save()
+        self.assertEqual(self.found('огородники'), ['Урожай'])
+
+    @override_settings(POST_PER_PAGE=2, SEARCH_MAX_RESULTS=3)
+    def test_results_paginated_and_capped(self):
+        for number in range(5):
+            Post.objects.create(text=f'Заметка {number}', author=self.user)
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'заметка'}
+        )
+        self.assertEqual(response.context['paginator'].count, 3)
+        self.assertContains(response, 'q=%D0%B7%D0%B0%D0%BC%D0%B5%D1%82'
+                                      '%D0%BA%D0%B0&amp;page=2')
+        self.assertEqual(len(self.found('заметка', page=2)), 1)
+
+    def test_empty_query(self):
+        Post.objects.create(text='текст', author=self.user)
+        self.assertEqual(self.found(''), [])
+        self.assertEqual(self.found('*'), [])
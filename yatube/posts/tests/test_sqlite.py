@@ -0,0 +1,26 @@
+from django.db import connections
+from django.test import TestCase, override_settings
+
+
+class SqliteProfileTests(TestCase):
+    def open_connection(self):
+        default = connections['default']
+        wrapper = type(default)(default.settings_dict, alias='probe')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    @override_settings(
+        SQLITE_PRAGMAS=['busy_timeout=1234', 'cache_size=-4096']
+    )
+    def test_pragmas_applied_to_new_connections(self):
+        with self.open_connection().cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -4096)
+
+    @override_settings(SQLITE_PRAGMAS=[])
+    def test_default_profile_keeps_sqlite_defaults(self):
+        with self.open_connection().cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -2000)
@@ -0,0 +1,140 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import image_variants, thumbnails
+from posts.models import Post, User
+from posts.tests.utils import on_commit_callbacks
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='тестовый автор')
+        test_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.post = Post.objects.create(
+            text='тестовый текст',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name='test.gif', content=test_gif, content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.post.refresh_from_db()
+        self.guest_client = Client()
+
+    def test_original_until_thumbnail_ready(self):
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.image.url)
+
+        with on_commit_callbacks():
+            thumbnails.generate(self.post.pk, self.post.image.name)
+        self.post.refresh_from_db()
+        thumbnail_url = thumbnails.card_url(self.post)
+        self.assertIsNotNone(thumbnail_url)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnail_url)
+        self.assertNotContains(response, self.post.image.url)
+
+    def test_ready_thumbnail_survives_cache_loss(self):
+        with on_commit_callbacks():
+            thumbnails.generate(self.post.pk, self.post.image.name)
+        self.post.refresh_from_db()
+        updated = self.post.updated
+        cache.clear()
+        # отрисовка не ставит готовую миниатюру в очередь снова
+        with on_commit_callbacks():
+            response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnails.card_url(self.post))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.updated, updated)
+
+    def test_new_image_drops_thumbnail(self):
+        with on_commit_callbacks():
+            thumbnails.generate(self.post.pk, self.post.image.name)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertTrue(post.card_thumbnail)
+        post.image = SimpleUploadedFile(
+            name='other.gif', content=self.post.image.open().read(),
+            content_type='image/gif'
+        )
+        post.save(update_fields=['image'])
+        post.refresh_from_db()
+        self.assertEqual(post.card_thumbnail, '')
+        self.assertEqual(image_variants.sources(post), [])
+
+    def test_failed_thumbnail_not_retried_on_every_render(self):
+        post = Post.objects.create(
+            text='битая картинка', author=self.user,
+            image=SimpleUploadedFile(
+                name='broken.gif', content=b'not an image',
+                content_type='image/gif'
+            ),
+        )
+        with self.assertLogs('posts.thumbnails', 'ERROR'):
+            with on_commit_callbacks():
+                response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, post.image.url)
+        # следующая отрисовка показывает оригинал, не пробуя снова
+        with self.assertNoLogs('posts.thumbnails', 'ERROR'):
+            with on_commit_callbacks():
+                thumbnails.enqueue(post)
+
+    @override_settings(
+        IMAGE_VARIANT_WIDTHS=[480], IMAGE_VARIANT_FORMATS=['xbm', 'webp']
+    )
+    def test_variant_failure_keeps_thumbnail(self):
+        # XBM хранит только чёрно-белые картинки: RGB сохранить нельзя
+        with self.assertLogs('posts.image_variants', 'ERROR'):
+            with on_commit_callbacks():
+                thumbnails.generate(self.post.pk, self.post.image.name)
+        self.post.refresh_from_db()
+        self.assertIsNotNone(thumbnails.card_url(self.post))
+        self.assertEqual(
+            [source['type'] for source in image_variants.sources(self.post)],
+            ['image/webp']
+        )
+
+    @override_settings(
+        IMAGE_VARIANT_WIDTHS=[480, 960], IMAGE_VARIANT_FORMATS=['webp']
+    )
+    def test_responsive_variants(self):
+        thumbnails.generate(self.post.pk, self.post.image.name)
+        for width in (480, 960):
+            with self.subTest(width=width):
+                self.assertTrue(default_storage.exists(
+                    image_variants.variant_name(
+                        self.post.image.name, width, 'webp'
+                    )
+                ))
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, '.w480.webp 480w')
+        self.assertContains(response, '.w960.webp 960w')
+        # список вариантов лежит в посте и не теряется вместе с кешем
+        cache.clear()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, '.w960.webp 960w')
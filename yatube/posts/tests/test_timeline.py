@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import timeline
+from posts.models import Follow, Post, ProfileStats, TimelineEntry, User
+from posts.tests.utils import on_commit_callbacks
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='тестовый автор')
+        cls.reader = User.objects.create_user(username='читатель')
+        cls.old_post = Post.objects.create(text='старый', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(TimelineTests.reader)
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author.username}
+        ))
+        self.assertEqual(self.feed(), [self.old_post])
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        self.assertEqual(self.feed(), [])
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='новый', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_is_read_on_demand(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        fan = User.objects.create_user(username='поклонник')
+        Follow.objects.create(user=fan, author=self.author)
+        post = Post.objects.create(text='популярный', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+        # отписка только ставит автора в очередь, посты до разбора
+        # очереди по-прежнему дочитываются при чтении
+        with on_commit_callbacks():
+            Follow.objects.filter(user=fan).delete()
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+        with on_commit_callbacks():
+            call_command('backfill_timelines', stdout=StringIO())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertFalse(
+            ProfileStats.objects.get(user=self.author).backfill_pending
+        )
+        self.assertNotIn(self.author.pk, timeline.popular_author_ids())
+        self.assertEqual(self.feed(), [post, self.old_post])
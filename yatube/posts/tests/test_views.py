@@ -1,6 +1,7 @@
 from django import forms
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from posts.models import Comment, Follow, Group, Post, User
 
@@ -206,3 +207,108 @@ class GroupURLTests(TestCase):
         self.assertEqual(author, self.user)
         self.assertEqual(response.context.get('post'), self.post)
         self.assertEqual(image, self.post.image)
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='тестовый автор')
+        cls.reader = User.objects.create_user(username='читатель')
+        cls.group = Group.objects.create(
+            title='тестовая группа',
+            slug='testslug',
+            description='тестовое описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(FeedQueriesTests.reader)
+
+    def create_posts(self, count):
+        for number in range(count):
+            post = Post.objects.create(
+                text=f'текст номер {number}',
+                author=self.user,
+                group=self.group,
+            )
+            Comment.objects.create(
+                author=self.reader, post=post, text='коммент'
+            )
+
+    def test_feed_query_count_does_not_grow(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        # для гостей группа и автор сначала ищутся по pk ради ETag,
+        # у читателя ещё сессия, подписки и рекомендации «Кого почитать»
+        profile = reverse('posts:profile',
+                          kwargs={'username': self.user.username})
+        feeds = [
+            (reverse('posts:index'), self.guest_client, 1),
+            (reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+             self.guest_client, 3),
+            (profile, self.guest_client, 3),
+            (profile, self.reader_client, 6),
+            (reverse('posts:follow_index'), self.reader_client, 5),
+        ]
+        for post_count in (1, 10):
+            self.create_posts(post_count)
+            for url, client, queries in feeds:
+                cache.clear()
+                with self.subTest(url=url, post_count=post_count):
+                    with self.assertNumQueries(queries):
+                        client.get(url)
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='тестовый автор')
+        cls.post = Post.objects.create(text='текст', author=cls.user)
+        for number in range(7):
+            reader = User.objects.create_user(username=f'читатель {number}')
+            Comment.objects.create(
+                author=reader, post=cls.post, text=f'коммент {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def texts(self, response):
+        return [comment.text for comment in response.context['comments']]
+
+    def test_comments_loaded_by_pages(self):
+        response = self.guest_client.get(reverse(
+            'posts:post', args=[self.user.username, self.post.id]
+        ))
+        self.assertEqual(
+            self.texts(response), ['коммент 6', 'коммент 5', 'коммент 4']
+        )
+        texts = self.texts(response)
+        url = reverse(
+            'posts:post_comments', args=[self.user.username, self.post.id]
+        )
+        cursor = response.context['next_cursor']
+        while cursor:
+            self.assertContains(response, f'{url}?cursor={cursor}')
+            with self.assertNumQueries(2):
+                response = self.guest_client.get(url, {'cursor': cursor})
+            texts += self.texts(response)
+            cursor = response.context['next_cursor']
+        self.assertEqual(
+            texts, [f'коммент {number}' for number in range(6, -1, -1)]
+        )
+        self.assertNotContains(response, 'Показать ещё')
+
+    def test_comment_authors_loaded_in_one_query(self):
+        url = reverse('posts:post', args=[self.user.username, self.post.id])
+        self.guest_client.get(url)
+        with self.assertNumQueries(3):
+            self.guest_client.get(url)
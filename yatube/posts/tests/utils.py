@@ -0,0 +1,22 @@
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def on_commit_callbacks():
+    """
+    Выполняем колбэки transaction.on_commit, отложенные внутри блока.
+
+    TestCase держит каждый тест в транзакции, которая не коммитится,
+    поэтому сброс кешей после коммита без этого в тестах не наступает.
+    Аналог captureOnCommitCallbacks(execute=True) из Django 3.2.
+    """
+    start = len(connection.run_on_commit)
+    yield
+    # колбэк может отложить следующий, поэтому выполняем до конца
+    while len(connection.run_on_commit) > start:
+        callbacks = connection.run_on_commit[start:]
+        del connection.run_on_commit[start:]
+        for _, callback in callbacks:
+            callback()
@@ -0,0 +1,104 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from . import feed_cache, image_variants
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+CARD_GEOMETRY = '960x339'
+CARD_OPTIONS = {'crop': 'center', 'upscale': True}
+FAILED_KEY = 'thumbnail_failed:{}'
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.THUMBNAIL_WORKERS or 1,
+    thread_name_prefix='thumbnails'
+)
+_in_flight = set()
+_lock = threading.Lock()
+
+
+def card_url(post):
+    """
+    URL миниатюры карточки, если она уже готова, иначе None.
+    """
+    if not post.card_thumbnail:
+        return None
+    return default_storage.url(post.card_thumbnail)
+
+
+def generate(post_id, name):
+    """
+    Делаем миниатюру и адаптивные варианты картинки name поста post_id,
+    записываем миниатюру в пост и обновляем его версию, чтобы HTML
+    перерисовался.
+
+    Готовность хранится в самом посте, а не в кеше: вытеснение ключа не
+    должно снова запускать кодирование и сбрасывать ленты. Ошибка
+    кодировщика WebP или AVIF не оставляет карточку с оригиналом.
+    Миниатюра и список вариантов пишутся в пост одним UPDATE, поэтому
+    карточка не бывает готовой без своих <source>.
+    """
+    thumbnail = get_thumbnail(name, CARD_GEOMETRY, **CARD_OPTIONS)
+    if not thumbnail.exists():
+        # на нечитаемый оригинал sorl не бросает исключение, а отдаёт
+        # миниатюру, которой нет в хранилище
+        raise OSError(f'Не удалось прочитать {name}')
+    sources = ''
+    try:
+        sources = image_variants.generate(name)
+    except Exception:
+        logger.exception('Не удалось сделать варианты картинки %s', name)
+    # пост могли удалить или заменить в нём картинку, пока мы её резали
+    if Post.objects.filter(pk=post_id, image=name).update(
+        card_thumbnail=thumbnail.name, image_sources=sources,
+        updated=timezone.now()
+    ):
+        feed_cache.post_changed(Post.objects.only(
+            'author_id', 'group_id'
+        ).get(pk=post_id))
+
+
+def _work(post_id, name):
+    try:
+        generate(post_id, name)
+    except Exception:
+        logger.exception('Не удалось сделать миниатюру %s', name)
+        # иначе каждая отрисовка битой картинки снова ставит её в очередь
+        cache.set(FAILED_KEY.format(name), True,
+                  settings.THUMBNAIL_RETRY_SECONDS)
+    finally:
+        with _lock:
+            _in_flight.discard(post_id)
+        if settings.THUMBNAIL_WORKERS:
+            connections.close_all()
+
+
+def _submit(post_id, name):
+    with _lock:
+        if post_id in _in_flight:
+            return
+        _in_flight.add(post_id)
+    if settings.THUMBNAIL_WORKERS:
+        _executor.submit(_work, post_id, name)
+    else:
+        _work(post_id, name)
+
+
+def enqueue(post):
+    """
+    Ставим миниатюру поста в очередь фонового пула после коммита
+    транзакции, если её ещё нет и недавно её не пытались сделать.
+    """
+    if (post.image and not post.card_thumbnail
+            and not cache.get(FAILED_KEY.format(post.image.name))):
+        post_id, name = post.pk, post.image.name
+        transaction.on_commit(lambda: _submit(post_id, name))
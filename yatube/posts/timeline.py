@@ -0,0 +1,273 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import Follow, Post, ProfileStats, TimelineEntry
+
+POPULAR_AUTHORS_KEY = 'timeline:popular_authors'
+
+
+def follower_count(author_id):
+    stats = ProfileStats.objects.filter(user_id=author_id)
+    return stats.values_list('followers_count', flat=True).first() or 0
+
+
+def is_popular(author_id):
+    return follower_count(author_id) > settings.TIMELINE_FANOUT_LIMIT
+
+
+def popular_author_ids():
+    """
+    Авторы, у которых подписчиков больше TIMELINE_FANOUT_LIMIT, и авторы,
+    ждущие backfill_pending().
+
+    Их посты не раскладываются по лентам при записи, а дочитываются
+    при чтении. Множество берётся по индексам ProfileStats, живёт в
+    кеше TIMELINE_POPULAR_TIMEOUT секунд и сбрасывается после коммита,
+    когда автор пересекает порог. Читаем его с основной базы: реплика,
+    не догнавшая этот коммит, вернула бы в кеш старое множество.
+    """
+    authors = cache.get(POPULAR_AUTHORS_KEY)
+    if authors is None:
+        authors = set(
+            ProfileStats.objects.using('default').filter(
+                Q(followers_count__gt=settings.TIMELINE_FANOUT_LIMIT)
+                | Q(backfill_pending=True)
+            ).values_list('user_id', flat=True)
+        )
+        cache.set(POPULAR_AUTHORS_KEY, authors,
+                  settings.TIMELINE_POPULAR_TIMEOUT)
+    return authors
+
+
+def popular_changed():
+    transaction.on_commit(lambda: cache.delete(POPULAR_AUTHORS_KEY))
+
+
+def schedule_backfill(author_ids):
+    """
+    Отмечаем авторов, чьи посты разложит по лентам backfill_pending().
+    """
+    if ProfileStats.objects.filter(user_id__in=author_ids).update(
+        backfill_pending=True
+    ):
+        popular_changed()
+
+
+def fan_out(post):
+    """
+    Раскладываем новый пост по лентам подписчиков автора.
+    """
+    if is_popular(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_ids, author_id):
+    """
+    Добавляем в ленты подписчиков последние посты автора.
+    """
+    posts = list(
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'pub_date')[:settings.TIMELINE_BACKFILL_LIMIT]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for user_id in user_ids
+            for post_id, pub_date in posts
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def recent_posts(author_ids):
+    """
+    До TIMELINE_BACKFILL_LIMIT последних постов каждого автора одним
+    запросом: (id, pub_date) по всем авторам вместе.
+    """
+    ranked = Post.objects.filter(author_id__in=author_ids).annotate(
+        rank=Window(
+            RowNumber(), partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        )
+    ).values_list('id', 'pub_date', 'rank')
+    # фильтровать по оконной функции ORM не умеет, оборачиваем запрос
+    sql, params = ranked.query.sql_with_params()
+    posts = Post.objects.raw(
+        f'SELECT id, pub_date FROM ({sql}) WHERE rank <= %s',
+        params + (settings.TIMELINE_BACKFILL_LIMIT,)
+    )
+    return [(post.id, post.pub_date) for post in posts]
+
+
+def backfill_followers(author_id, batch_size=1000):
+    """
+    Раскладываем последние посты автора по лентам всех его подписчиков
+    пачками, каждая в своей транзакции.
+    """
+    chunk = max(1, batch_size // settings.TIMELINE_BACKFILL_LIMIT)
+    followers = Follow.objects.filter(author_id=author_id).order_by('user_id')
+    last = 0
+    while True:
+        with transaction.atomic():
+            user_ids = list(
+                followers.filter(user_id__gt=last)
+                .values_list('user_id', flat=True)[:chunk]
+            )
+            if not user_ids:
+                return
+            backfill(user_ids, author_id)
+        last = user_ids[-1]
+
+
+def backfill_pending(batch_size=1000):
+    """
+    Раскладываем посты авторов, переставших быть популярными.
+
+    Отписка, после которой у автора не больше TIMELINE_FANOUT_LIMIT
+    подписчиков, только ставит отметку (schedule_backfill): раскладывать
+    до миллиона записей внутри запроса слишком долго. Запускается по
+    расписанию командой backfill_timelines. Возвращает число авторов.
+    """
+    authors = list(
+        ProfileStats.objects.filter(backfill_pending=True)
+        .values_list('user_id', flat=True)
+    )
+    for author_id in authors:
+        if not is_popular(author_id):
+            backfill_followers(author_id, batch_size)
+        ProfileStats.objects.filter(user_id=author_id).update(
+            backfill_pending=False
+        )
+        popular_changed()
+    return len(authors)
+
+
+def rebuild(batch_size=1000):
+    """
+    Заново раскладываем посты по лентам всех подписчиков, например
+    после массовой загрузки через bulk_create, которая не шлёт сигналов.
+    """
+    cache.delete(POPULAR_AUTHORS_KEY)
+    TimelineEntry.objects.all().delete()
+    popular = popular_author_ids()
+    authors = Follow.objects.order_by().values_list(
+        'author_id', flat=True
+    ).distinct()
+    for author_id in authors.iterator():
+        if author_id in popular:
+            continue
+        backfill_followers(author_id, batch_size)
+
+
+def follow_created(user_id, author_id):
+    followers = follower_count(author_id)
+    if followers == settings.TIMELINE_FANOUT_LIMIT + 1:
+        # автор стал популярным: дальше его посты дочитываются при чтении
+        popular_changed()
+    if followers <= settings.TIMELINE_FANOUT_LIMIT:
+        backfill([user_id], author_id)
+
+
+def follow_deleted(user_id, author_id):
+    prune(user_id, author_id)
+    if follower_count(author_id) == settings.TIMELINE_FANOUT_LIMIT:
+        # автор перестал быть популярным: его посты, которые раньше
+        # дочитывались при чтении, разложит backfill_pending()
+        schedule_backfill([author_id])
+
+
+def follows_created(user_id, author_ids):
+    """
+    follow_created для пачки новых подписок пользователя: посты
+    непопулярных авторов попадают в ленту одной вставкой.
+
+    Как и follow_created, решаем по уже увеличенным счётчикам, а не по
+    закешированному множеству популярных авторов.
+    """
+    stats = ProfileStats.objects.filter(user_id__in=author_ids)
+    if stats.filter(
+        followers_count=settings.TIMELINE_FANOUT_LIMIT + 1
+    ).exists():
+        popular_changed()
+    posts = recent_posts(list(
+        stats.filter(
+            followers_count__lte=settings.TIMELINE_FANOUT_LIMIT
+        ).values_list('user_id', flat=True)
+    ))
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def follows_deleted(user_id, author_ids):
+    """
+    follow_deleted для пачки отписок пользователя: авторов, переставших
+    быть популярными, разложит backfill_pending().
+    """
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id__in=author_ids
+    ).delete()
+    schedule_backfill(list(
+        ProfileStats.objects.filter(
+            user_id__in=author_ids,
+            followers_count=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+    ))
+
+
+def prune(user_id, author_id):
+    """
+    Убираем из ленты посты автора, от которого пользователь отписался.
+    """
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def timeline_posts(user):
+    """
+    Лента подписок пользователя и параметры курсора для неё.
+
+    Обычно это диапазон по индексу (user, pub_date) в TimelineEntry.
+    Если пользователь подписан на популярных авторов, их посты
+    подмешиваются при чтении: обе части выбираются по индексам, но
+    объединение SQLite сортирует целиком (USE TEMP B-TREE FOR ORDER BY).
+    Это принятая цена: так читают только подписчики популярных авторов,
+    а сортируются лишь их записи ленты и посты этих авторов до курсора.
+    """
+    posts = Post.objects.for_feed()
+    popular = popular_author_ids()
+    if popular:
+        popular = set(
+            Follow.objects.filter(user=user, author_id__in=popular)
+            .values_list('author_id', flat=True)
+        )
+    if not popular:
+        posts = posts.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_post=F('timeline_entries__post'),
+        )
+        return posts, {'date_field': 'feed_date', 'id_field': 'feed_post'}
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    return posts.filter(Q(id__in=entries) | Q(author_id__in=popular)), {}
@@ -1,12 +1,22 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = "posts"
 
 urlpatterns = [
     path('', views.index, name='index'),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search, name="search"),
+    path("api/posts/", api.index, name="api_index"),
+    path("api/posts/<int:post_id>/", api.post_detail, name="api_post"),
+    path("api/group/<slug:slug>/", api.group_posts, name="api_group_posts"),
+    path("api/profile/<str:username>/", api.profile, name="api_profile"),
+    path("api/follow/", api.follow_index, name="api_follow_index"),
+    path("api/follow/bulk/", api.follow_bulk, name="api_follow_bulk"),
+    path("api/unfollow/bulk/", api.unfollow_bulk, name="api_unfollow_bulk"),
+    path("metrics/cache/", views.cache_stats, name="cache_stats"),
+    path("metrics/requests/", views.request_stats, name="request_stats"),
     path("<str:username>/unfollow/", views.profile_unfollow,
          name="profile_unfollow"),
     path("<str:username>/follow/", views.profile_follow,
@@ -17,6 +27,8 @@ urlpatterns = [
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path('<str:username>/<int:post_id>/edit/', views.post_edit,
          name='post_edit'),
+    path('<str:username>/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('misc/400', views.page_not_found),
     path('misc/500', views.server_error),
     path("<username>/<int:post_id>/comment", views.add_comment,
@@ -1,84 +1,157 @@
+import os
+
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from yatube.caches import metrics
+from yatube.instrumentation import request_metrics
+from yatube.routers import replica_reads
 
+from . import follow_graph, recommendations, thumbnails
+from .conditional import anonymous_conditional
+from .feed_cache import feed_cache
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
+from .paginators import CursorPaginator, encode_cursor, paginate
+from .search import SearchResults
+from .timeline import timeline_posts
+
+
+def group_scopes(slug):
+    pk = Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    return None if pk is None else (f'group:{pk}',)
+
+
+def author_scopes(username, **kwargs):
+    # в карточке автора его счётчики подписчиков и подписок
+    pk = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+    return None if pk is None else (f'profile:{pk}', f'stats:{pk}')
 
 
+@replica_reads
+@anonymous_conditional(lambda: ('posts',))
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, settings.POST_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    # версии до чтения ленты: свежая переводит его на основную базу
+    cache_params = feed_cache(request, 'posts')
+    post_list = Post.objects.for_feed()
+    paginator, page = paginate(request, post_list)
     context = {
         "page": page,
-        "paginator": paginator
+        "paginator": paginator,
+        "feed_cache": cache_params,
     }
     return render(request, "index.html", context)
 
 
+@replica_reads
+@anonymous_conditional(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    group_posts = group.posts_group.all()
-    paginator = Paginator(group_posts, settings.POST_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    cache_params = feed_cache(request, f'group:{group.pk}')
+    group_posts = group.posts_group.for_feed()
+    paginator, page = paginate(request, group_posts)
     context = {
         'page': page,
         'group': group,
         'paginator': paginator,
+        'feed_cache': cache_params,
     }
     return render(request, 'group.html', context)
 
 
 @login_required
+@transaction.atomic
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.enqueue(post)
     else:
         return render(request, 'new.html', {'form': form})
     return redirect(reverse('posts:index'))
 
 
+@replica_reads
+@anonymous_conditional(author_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, settings.POST_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    if request.user.is_authenticated:
-        following = author.following.filter(user=request.user).exists()
-    else:
-        following = False
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    cache_params = feed_cache(request, f'profile:{author.pk}')
+    post_list = author.posts.for_feed()
+    paginator, page = paginate(request, post_list)
+    following = follow_graph.is_following(request.user, author.pk)
     context = {
         'author': author,
         'page': page,
         'paginator': paginator,
         'following': following,
+        'recommendations': [
+            candidate for candidate in recommendations.for_user(request.user)
+            if candidate != author
+        ],
+        'feed_cache': cache_params,
     }
     return render(request, 'profile.html', context)
 
 
+@replica_reads
+@anonymous_conditional(author_scopes)
 def post_view(request, username, post_id):
     form = CommentForm()
-    post = get_object_or_404(Post, author__username=username, id=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.for_feed().select_related('author__stats'),
+        author__username=username, id=post_id
+    )
+    # сразу показываем только свежие комментарии, остальные — по кнопке
+    comments = post.comments.select_related('author').order_by(
+        '-created', '-id'
+    )[:settings.COMMENTS_PER_PAGE]
+    next_cursor = None
+    if post.comment_count > len(comments):
+        last = comments[len(comments) - 1]
+        next_cursor = encode_cursor(last.created, last.pk)
     author = post.author
     context = {
         'post': post,
         'author': author,
         'form': form,
         'comments': comments,
+        'next_cursor': next_cursor,
     }
     return render(request, 'post.html', context)
 
 
+def post_comments(request, username, post_id):
+    """
+    Следующая страница комментариев к посту HTML-фрагментом для «Показать ещё»
+    """
+    post = get_object_or_404(
+        Post.objects.select_related('author'),
+        author__username=username, id=post_id
+    )
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_PER_PAGE, date_field='created'
+    )
+    page = paginator.get_page(request.GET.get('cursor'))
+    context = {
+        'post': post,
+        'comments': page,
+        'next_cursor': paginator.next_cursor,
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
 @login_required
 def post_edit(request, username, post_id):
     post = get_object_or_404(Post, author__username=username, id=post_id)
@@ -88,7 +161,9 @@ def post_edit(request, username, post_id):
                     files=request.FILES or None, instance=post)
     if not form.is_valid():
         return render(request, 'new.html', {'form': form, 'post': post})
-    post.save()
+    # comment_count меняется параллельно через F(), его не перезаписываем
+    post.save(update_fields=PostForm.Meta.fields + ['updated'])
+    thumbnails.enqueue(post)
     return redirect('posts:post', username=username, post_id=post_id)
 
 
@@ -116,21 +191,39 @@ def add_comment(request, username, post_id):
     return redirect('posts:post', username=username, post_id=post_id)
 
 
+@replica_reads
 @login_required
 def follow_index(request):
-    follow_posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(follow_posts, settings.POST_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    cache_params = feed_cache(request, 'posts', f'follow:{request.user.pk}')
+    follow_posts, cursor_fields = timeline_posts(request.user)
+    paginator, page = paginate(request, follow_posts, **cursor_fields)
     context = {
         'page': page,
-        'paginator': paginator
+        'paginator': paginator,
+        'feed_cache': cache_params,
+        'recommendations': recommendations.for_user(request.user),
     }
     # информация о текущем пользователе доступна в переменной request.user
     return render(request, 'follow.html', context)
 
 
+def search(request):
+    """
+    Поиск по тексту постов и названиям и описаниям групп
+    """
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(SearchResults(query), settings.POST_PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page': page,
+        'paginator': paginator,
+    }
+    return render(request, 'search.html', context)
+
+
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     """
     Отписаться от автора
@@ -144,6 +237,7 @@ def profile_unfollow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     """
     Подписаться на конкретного юзера.
@@ -153,3 +247,26 @@ def profile_follow(request, username):
     if request.user != author:
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', author)
+
+
+@staff_member_required
+def cache_stats(request):
+    """
+    Попадания и промахи кеша этого процесса по группам ключей.
+    """
+    groups = metrics.snapshot()
+    for counts in groups.values():
+        total = counts['hits'] + counts['misses']
+        counts['hit_rate'] = round(counts['hits'] / total, 3) if total else 0
+    return JsonResponse({'pid': os.getpid(), 'groups': groups})
+
+
+@staff_member_required
+def request_stats(request):
+    """
+    Гистограммы времени и запросов этого процесса по именам URL.
+    """
+    return JsonResponse({
+        'pid': os.getpid(),
+        'views': request_metrics.snapshot(),
+    })
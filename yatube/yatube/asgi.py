@@ -0,0 +1,205 @@
+"""
+ASGI config for yatube project.
+
+Django 2.2 не умеет ASGI, поэтому обычные запросы уходят в
+WSGI-приложение в ограниченном пуле из ASGI_THREADS потоков, а
+EVENTS_PATH обслуживает асинхронный EventStream (posts/simple_socker.py).
+
+Тело запроса дочитывается и готовый ответ отправляется в цикле событий,
+так что медленная загрузка картинки или медленный клиент держат корутину,
+а не поток: поток пула занят только на время работы самого представления.
+Потоковые ответы (StreamingHttpResponse, FileResponse) не копятся в
+памяти, а уходят клиенту по частям прямо из потока пула.
+Сравнить с WSGI под нагрузкой: manage.py benchmark --concurrency 200.
+Запуск, например: uvicorn yatube.asgi:application
+"""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+django_application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+from posts.simple_socker import EventStream  # noqa: E402
+
+
+def wsgi_environ(scope, body, size=None):
+    """
+    Окружение WSGI (PEP 3333) для HTTP-запроса ASGI.
+
+    body — файл с уже прочитанным телом, size — его длина: она заменяет
+    Content-Length, которого при chunked-передаче нет вовсе.
+    """
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+            continue
+        key = f'HTTP_{name}'
+        if key in environ:
+            # повторные Cookie склеиваются как в одном заголовке (RFC 6265)
+            separator = '; ' if name == 'COOKIE' else ','
+            value = f'{environ[key]}{separator}{value}'
+        environ[key] = value
+    if size is not None:
+        environ['CONTENT_LENGTH'] = str(size)
+    return environ
+
+
+def content_length(scope):
+    for name, value in scope.get('headers', []):
+        if name.lower() == b'content-length':
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+async def send_too_large(send):
+    body = 'Слишком большой запрос'.encode()
+    await send({'type': 'http.response.start', 'status': 413, 'headers': [
+        (b'content-type', b'text/plain; charset=utf-8'),
+        (b'content-length', str(len(body)).encode()),
+    ]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class WsgiBridge:
+    """
+    Запускает WSGI-приложение в пуле потоков и отдаёт ответ по ASGI.
+    """
+
+    def __init__(self, wsgi_application, executor):
+        self.wsgi_application = wsgi_application
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        limit = settings.ASGI_MAX_BODY_SIZE
+        if (content_length(scope) or 0) > limit:
+            await send_too_large(send)
+            return
+        # большие загрузки уходят на диск, а не в память воркера
+        body = SpooledTemporaryFile(settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        size = 0
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                size += len(chunk)
+                if size > limit:
+                    # Content-Length мог не прийти или соврать
+                    await send_too_large(send)
+                    return
+                body.write(chunk)
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            loop = asyncio.get_event_loop()
+
+            def send_from_thread(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            messages = await loop.run_in_executor(
+                self.executor, self.run,
+                wsgi_environ(scope, body, size), send_from_thread
+            )
+        finally:
+            body.close()
+        for message in messages:
+            await send(message)
+
+    def run(self, environ, send):
+        """
+        Выполняет WSGI-приложение и возвращает сообщения ASGI с ответом.
+
+        Обычный ответ уже целиком в памяти, его отправит цикл событий.
+        Потоковый отправляется отсюда по мере того, как появляются части:
+        send ждёт, пока цикл событий передаст часть клиенту.
+        """
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ]
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            messages = [{'type': 'http.response.start', **started}]
+            chunks = (
+                {'type': 'http.response.body', 'body': chunk,
+                 'more_body': True}
+                for chunk in result if chunk
+            )
+            if getattr(result, 'streaming', False):
+                send(messages.pop())
+                for message in chunks:
+                    send(message)
+            else:
+                messages.extend(chunks)
+            messages.append({'type': 'http.response.body', 'body': b''})
+            return messages
+        finally:
+            # close() шлёт request_finished: Django закрывает соединения
+            # этого потока, поэтому вызываем его здесь же
+            if hasattr(result, 'close'):
+                result.close()
+
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASGI_THREADS, thread_name_prefix='asgi'
+)
+django_bridge = WsgiBridge(django_application, executor)
+events = EventStream(executor)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif scope['type'] != 'http':
+        raise ValueError(f'Неподдерживаемый тип соединения: {scope["type"]}')
+    elif scope['path'] == settings.EVENTS_PATH:
+        await events(scope, receive, send)
+    else:
+        await django_bridge(scope, receive, send)
@@ -0,0 +1,173 @@
+"""
+Настройка общего кеша из CACHE_URL и учёт попаданий/промахов.
+
+Примеры CACHE_URL:
+    file:///var/tmp/yatube-cache   — файловый кеш, общий для воркеров
+                                     одной машины; по умолчанию при DEBUG
+    locmem://                      — кеш в памяти процесса; только для
+                                     одного процесса: версии лент и сброс
+                                     подписок не доходят до других воркеров
+    memcached://127.0.0.1:11211    — memcached через python-memcached
+    redis://127.0.0.1:6379/1       — Redis через пакет django-redis
+
+Файловый кеш годится для разработки: перед каждой записью он читает
+весь каталог, чтобы решить, не пора ли чистить, так что с тысячами
+ключей каждая запись — тысячи файлов. В production CACHE_URL указывает
+на memcached или Redis (см. settings.py).
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.core.cache.backends.base import BaseCache
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+    'pymemcached': 'django.core.cache.backends.memcached.PyLibMCCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+
+# Django по умолчанию держит в файловом кеше 300 ключей и при переполнении
+# выбрасывает треть наугад, в том числе версии лент
+FILE_MAX_ENTRIES = 10000
+
+
+def parse_cache_url(url):
+    parts = urlsplit(url)
+    if parts.scheme not in BACKENDS:
+        raise ValueError(f'Неизвестная схема кеша: {url}')
+    config = {'BACKEND': BACKENDS[parts.scheme]}
+    if parts.scheme == 'file':
+        config['LOCATION'] = parts.path
+        config['OPTIONS'] = {'MAX_ENTRIES': FILE_MAX_ENTRIES}
+    elif parts.scheme == 'redis':
+        config['LOCATION'] = url
+    elif parts.scheme != 'locmem':
+        config['LOCATION'] = parts.netloc
+    return config
+
+
+def cache_settings(url):
+    """
+    Значение CACHES: бэкенд из url с учётом попаданий в MeteredCache.
+    """
+    return {
+        'default': {
+            'BACKEND': 'yatube.caches.MeteredCache',
+            'OPTIONS': {
+                'INNER': {
+                    **parse_cache_url(url),
+                    'KEY_PREFIX': 'yatube',
+                },
+            },
+        }
+    }
+
+
+def key_group(key):
+    """
+    Группа ключа для метрик: имя фрагмента {% cache %} или префикс до ':'.
+    """
+    if key.startswith('template.cache.'):
+        return key.split('.')[2]
+    return key.split(':', 1)[0]
+
+
+class CacheMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {'hits': 0, 'misses': 0})
+        self._local = threading.local()
+
+    def record(self, key, hit):
+        outcome = 'hits' if hit else 'misses'
+        with self._lock:
+            self._counts[key_group(key)][outcome] += 1
+        request = getattr(self._local, 'request', None)
+        if request is not None:
+            request[outcome] += 1
+
+    @contextmanager
+    def track_request(self):
+        """
+        Отдельно считаем попадания и промахи текущего запроса в этом потоке.
+        """
+        counts = self._local.request = {'hits': 0, 'misses': 0}
+        try:
+            yield counts
+        finally:
+            self._local.request = None
+
+    def snapshot(self):
+        with self._lock:
+            return {group: dict(counts)
+                    for group, counts in self._counts.items()}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+metrics = CacheMetrics()
+
+
+class MeteredCache(BaseCache):
+    """
+    Обёртка над настоящим бэкендом из OPTIONS['INNER'], считающая
+    попадания и промахи get()/get_many() по группам ключей.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        inner = dict(params.get('OPTIONS', {}).get('INNER', {}))
+        backend = import_string(inner.pop('BACKEND'))
+        self._cache = backend(inner.pop('LOCATION', ''), inner)
+
+    def get(self, key, default=None, version=None):
+        sentinel = object()
+        value = self._cache.get(key, sentinel, version=version)
+        metrics.record(key, value is not sentinel)
+        return default if value is sentinel else value
+
+    def get_many(self, keys, version=None):
+        found = self._cache.get_many(keys, version=version)
+        for key in keys:
+            metrics.record(key, key in found)
+        return found
+
+    def add(self, *args, **kwargs):
+        return self._cache.add(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        return self._cache.set(*args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        return self._cache.set_many(*args, **kwargs)
+
+    def touch(self, *args, **kwargs):
+        return self._cache.touch(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._cache.delete(*args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        return self._cache.delete_many(*args, **kwargs)
+
+    def has_key(self, *args, **kwargs):
+        return self._cache.has_key(*args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        return self._cache.incr(*args, **kwargs)
+
+    def decr(self, *args, **kwargs):
+        return self._cache.decr(*args, **kwargs)
+
+    def clear(self):
+        return self._cache.clear()
+
+    def close(self, **kwargs):
+        return self._cache.close(**kwargs)
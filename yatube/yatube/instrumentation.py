@@ -0,0 +1,231 @@
+"""
+Лёгкие метрики запросов для продакшена.
+
+Для каждого имени URL копим гистограммы времени ответа, времени в базе,
+числа запросов к базе, попаданий и промахов кеша и времени рендера
+шаблонов. Гистограммы живут в памяти процесса; их отдаёт страница
+posts:request_stats, а если задан REQUEST_METRICS_FILE, раз в
+REQUEST_METRICS_INTERVAL секунд снимок пишется строкой JSON в
+ротируемый файл.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+from yatube.caches import metrics as cache_metrics
+
+# границы корзин: миллисекунды и штуки
+TIME_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+FIELDS = {
+    'wall_ms': TIME_BUCKETS,
+    'db_ms': TIME_BUCKETS,
+    'template_ms': TIME_BUCKETS,
+    'queries': COUNT_BUCKETS,
+    'cache_hits': COUNT_BUCKETS,
+    'cache_misses': COUNT_BUCKETS,
+}
+
+_local = threading.local()
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, share):
+        """
+        Верхняя граница корзины, в которую попадает доля share значений.
+        """
+        if not self.count:
+            return 0
+        seen = 0
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            if seen >= share * self.count:
+                return bound
+        return self.max
+
+    def as_dict(self):
+        buckets = {
+            f'le_{bound}': count
+            for bound, count in zip(self.bounds, self.buckets)
+        }
+        buckets['inf'] = self.buckets[-1]
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 3) if self.count else 0,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': round(self.max, 3),
+            'buckets': buckets,
+        }
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self.dumped_at = time.monotonic()
+
+    def record(self, view_name, values):
+        with self._lock:
+            histograms = self._views.get(view_name)
+            if histograms is None:
+                histograms = self._views[view_name] = {
+                    field: Histogram(bounds)
+                    for field, bounds in FIELDS.items()
+                }
+            for field, value in values.items():
+                histograms[field].add(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view_name: {
+                    field: histogram.as_dict()
+                    for field, histogram in histograms.items()
+                }
+                for view_name, histograms in self._views.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+request_metrics = RequestMetrics()
+
+
+class QueryTimer:
+    """
+    Обёртка для connection.execute_wrapper: число и время запросов.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        if getattr(_local, 'template_seconds', None) is None:
+            return super().render(context, request)
+        # вложенный render_to_string уже учтён во внешнем
+        depth = getattr(_local, 'template_depth', 0)
+        _local.template_depth = depth + 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            _local.template_depth = depth
+            if not depth:
+                _local.template_seconds += time.perf_counter() - started
+
+
+class TimedTemplates(DjangoTemplates):
+    """
+    Обычный бэкенд Django, который засекает время рендера шаблонов.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+@lru_cache(maxsize=None)
+def snapshot_log(path):
+    log = logging.Logger('yatube.request_metrics')
+    log.addHandler(RotatingFileHandler(
+        path,
+        maxBytes=settings.REQUEST_METRICS_FILE_BYTES,
+        backupCount=settings.REQUEST_METRICS_FILE_BACKUPS,
+    ))
+    return log
+
+
+def dump_if_due():
+    """
+    Пишем снимок гистограмм в файл не чаще REQUEST_METRICS_INTERVAL.
+    """
+    path = settings.REQUEST_METRICS_FILE
+    if not path:
+        return
+    now = time.monotonic()
+    if now - request_metrics.dumped_at < settings.REQUEST_METRICS_INTERVAL:
+        return
+    request_metrics.dumped_at = now
+    snapshot_log(path).info(json.dumps({
+        'time': time.time(),
+        'pid': os.getpid(),
+        'views': request_metrics.snapshot(),
+    }))
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryTimer()
+        _local.template_seconds = 0.0
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(queries))
+                cache = stack.enter_context(cache_metrics.track_request())
+                response = self.get_response(request)
+            wall = time.perf_counter() - started
+            template = _local.template_seconds
+        finally:
+            _local.template_seconds = None
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            request_metrics.record(match.view_name, {
+                'wall_ms': wall * 1000,
+                'db_ms': queries.seconds * 1000,
+                'template_ms': template * 1000,
+                'queries': queries.count,
+                'cache_hits': cache['hits'],
+                'cache_misses': cache['misses'],
+            })
+        dump_if_due()
+        return response
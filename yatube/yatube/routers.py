@@ -0,0 +1,106 @@
+"""
+Чтение с реплик для представлений, которые это разрешили.
+
+Запросы представления под @replica_reads читают с одной базы из
+REPLICA_DATABASES, выбранной на весь запрос: иначе число строк для
+пагинатора и сами строки пришли бы с реплик с разным отставанием.
+Всё остальное и любая запись идут в default.
+Реплика может отставать, поэтому клиент, который только что писал,
+ещё REPLICA_STICKY_SECONDS читает с основной базы: об этом помнит кука,
+которую ставит ReplicaRoutingMiddleware.
+
+Отставание видно не только писавшему: то, что представление кладёт в
+кеш под версией (feed_cache, follow_graph), потом отдаётся всем. Поэтому
+версия моложе REPLICA_STICKY_SECONDS переводит остаток запроса на
+основную базу (см. check_version), и под новой версией не окажется
+строк с реплики, ещё не получившей сменивший её коммит.
+"""
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+
+STICKY_COOKIE = 'db_primary'
+
+_state = threading.local()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not settings.REPLICA_DATABASES:
+            return None
+        replica = getattr(_state, 'replica', None)
+        if replica is None:
+            return None
+        if getattr(_state, 'pinned', False):
+            return 'default'
+        if getattr(_state, 'fresh', False):
+            # в кеш пойдёт то, чего на реплике может ещё не быть
+            return 'default'
+        if getattr(_state, 'wrote', False):
+            # своя запись в этом же запросе видна только в default
+            return 'default'
+        return replica
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики — копии default, объекты из них можно связывать
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+def replica_reads(view):
+    """
+    Разрешает представлению читать с реплик.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        outer = getattr(_state, 'replica', None)
+        outer_fresh = getattr(_state, 'fresh', False)
+        if outer is None and settings.REPLICA_DATABASES:
+            _state.replica = random.choice(settings.REPLICA_DATABASES)
+            _state.fresh = False
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica, _state.fresh = outer, outer_fresh
+    return wrapper
+
+
+def check_version(version):
+    """
+    Читаем дальше с основной базы, если версия кеша (time.time_ns() её
+    смены) моложе REPLICA_STICKY_SECONDS: реплика могла не догнать
+    коммит, после которого её сменили.
+
+    Вызывать до чтения данных, которые закешируют под этой версией.
+    """
+    age = time.time_ns() - version
+    if age < settings.REPLICA_STICKY_SECONDS * 10 ** 9:
+        _state.fresh = True
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.pinned = STICKY_COOKIE in request.COOKIES
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            if _state.wrote and settings.REPLICA_DATABASES:
+                response.set_cookie(
+                    STICKY_COOKIE, '1',
+                    max_age=settings.REPLICA_STICKY_SECONDS, httponly=True
+                )
+            return response
+        finally:
+            _state.pinned = _state.wrote = False
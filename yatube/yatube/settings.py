@@ -11,6 +11,11 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+
+from yatube.caches import cache_settings
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -50,6 +55,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.instrumentation.RequestMetricsMiddleware',
+    'yatube.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,7 +72,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.instrumentation.TimedTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,6 +81,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'posts.context_processors.post_cache',
+                'posts.context_processors.events',
             ],
         },
     },
@@ -85,13 +94,57 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Профиль базы: DB_PROFILE=production включает WAL и переиспользование
+# соединений; PRAGMA выполняются при каждом новом соединении (yatube/sqlite.py)
+DB_PROFILE = os.environ.get('DB_PROFILE', 'default')
+
+SQLITE_PROFILES = {
+    'default': {'pragmas': [], 'conn_max_age': 0},
+    'production': {
+        'pragmas': [
+            'journal_mode=WAL',
+            'synchronous=NORMAL',
+            'mmap_size=268435456',
+            'busy_timeout=5000',
+        ],
+        'conn_max_age': 600,
+    },
+}
+
+if DB_PROFILE not in SQLITE_PROFILES:
+    raise ImproperlyConfigured(
+        f'Неизвестный DB_PROFILE {DB_PROFILE!r}, допустимые: '
+        + ', '.join(SQLITE_PROFILES)
+    )
+
+SQLITE_PRAGMAS = SQLITE_PROFILES[DB_PROFILE]['pragmas']
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': SQLITE_PROFILES[DB_PROFILE]['conn_max_age'],
     }
 }
 
+# Реплики только для чтения (yatube/routers.py): пути к копиям базы через
+# запятую в DB_REPLICAS. С них читают представления под @replica_reads,
+# кроме клиентов, писавших в последние REPLICA_STICKY_SECONDS секунд
+for number, name in enumerate(
+    filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'], 'NAME': name, 'TEST': {'MIRROR': 'default'},
+    }
+
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+
+# Наибольшее ожидаемое отставание реплик: столько читают с основной базы
+# писавший клиент и запросы, кеширующие под версией моложе этого
+REPLICA_STICKY_SECONDS = 10
+
+DATABASE_ROUTERS = ['yatube.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -147,12 +200,114 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POST_PER_PAGE = 10
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
-}
+# Сколько секунд обратный прокси может отдавать гостям страницу без
+# перепроверки (Cache-Control: s-maxage), см. posts/conditional.py
+ANONYMOUS_CACHE_SECONDS = 60
+
+# Комментариев на первой странице поста и в каждой подгрузке
+COMMENTS_PER_PAGE = 20
+
+# 'cursor' — keyset-пагинация лент по (pub_date, id), 'page' — по номерам
+FEED_PAGINATION = 'cursor'
+
+# Общий для всех воркеров кеш задаётся через CACHE_URL (см. yatube/caches.py).
+# Версии лент и списки подписок сбрасываются записью в кеш, поэтому он должен
+# быть общим. Файловый по умолчанию — только для разработки; в production
+# (DEBUG = False) CACHE_URL обязателен: memcached или Redis.
+# Тесты работают со своим кешем в памяти (yatube/test_runner.py)
+if not DEBUG and 'CACHE_URL' not in os.environ:
+    raise ImproperlyConfigured(
+        'Задайте CACHE_URL: общий кеш memcached:// или redis://'
+    )
+
+CACHE_URL = os.environ.get(
+    'CACHE_URL',
+    'file://' + os.path.join(tempfile.gettempdir(), 'yatube-cache')
+)
+
+CACHES = cache_settings(CACHE_URL)
+
+TEST_RUNNER = 'yatube.test_runner.TestRunner'
+
+# Фрагменты лент сбрасываются сигналами; срок жизни — страховка
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# HTML поста кешируется по id и времени изменения
+POST_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сколько постов группы за один UPDATE помечать изменёнными, когда
+# меняются её название или адрес
+POST_CACHE_BATCH_SIZE = 500
+
+# Потоки фонового пула, который заранее готовит миниатюры картинок;
+# 0 — делать миниатюры сразу после коммита
+THUMBNAIL_WORKERS = 2
+
+# Сколько секунд не пробовать снова картинку, миниатюру которой
+# сделать не удалось; до тех пор показывается оригинал
+THUMBNAIL_RETRY_SECONDS = 60 * 60
+
+# Адаптивные варианты картинок постов: ширины для srcset и форматы
+# в порядке предпочтения; форматы, которых нет в Pillow, пропускаются
+IMAGE_VARIANT_WIDTHS = [480, 960, 1440]
+
+IMAGE_VARIANT_FORMATS = ['avif', 'webp']
+
+IMAGE_VARIANT_QUALITY = 80
+
+IMAGE_VARIANT_RATIO = 960 / 339
+
+# Поиск по постам (posts/search.py): сколько совпадений считаем и листаем
+SEARCH_MAX_RESULTS = 1000
+
+# Push-уведомления (posts/simple_socker.py) при запуске через yatube/asgi.py:
+# адрес потока событий, период пингов в секундах и очередь на клиента
+EVENTS_PATH = '/events/'
+EVENTS_HEARTBEAT = 25
+EVENTS_QUEUE_SIZE = 100
+
+# Потоки, в которых yatube/asgi.py выполняет синхронный Django
+ASGI_THREADS = 8
+
+# Больше стольких байт yatube/asgi.py тело запроса не дочитывает и
+# отвечает 413. DATA_UPLOAD_MAX_MEMORY_SIZE файлы не ограничивает,
+# а картинки к постам бывают в несколько мегабайт
+ASGI_MAX_BODY_SIZE = 20 * 1024 * 1024
+
+# Метрики запросов по именам URL (см. yatube/instrumentation.py);
+# при REQUEST_METRICS_FILE снимок гистограмм раз в REQUEST_METRICS_INTERVAL
+# секунд дописывается в ротируемый файл
+REQUEST_METRICS = True
+REQUEST_METRICS_FILE = os.environ.get('REQUEST_METRICS_FILE', '')
+REQUEST_METRICS_INTERVAL = 60
+REQUEST_METRICS_FILE_BYTES = 10 * 1024 * 1024
+REQUEST_METRICS_FILE_BACKUPS = 5
 
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
+
+# Лента подписок: посты авторов, у которых подписчиков больше лимита,
+# не раскладываются по лентам при публикации, а дочитываются при чтении.
+# Когда автор опускается до лимита, его посты раскладывает по расписанию
+# manage.py backfill_timelines
+TIMELINE_FANOUT_LIMIT = 1000
+
+# Сколько секунд живёт закешированное множество популярных авторов
+TIMELINE_POPULAR_TIMEOUT = 60
+
+TIMELINE_BACKFILL_LIMIT = 1000
+
+TIMELINE_BATCH_SIZE = 500
+
+# Массовые подписки (posts/follows.py): имён в пачке и в одном запросе API
+FOLLOW_BATCH_SIZE = 500
+
+FOLLOW_BULK_LIMIT = 5000
+
+# Сколько секунд живёт закешированный список подписок (posts/follow_graph.py)
+FOLLOW_GRAPH_TIMEOUT = 24 * 60 * 60
+
+# Сколько авторов «Кого почитать» хранить и показывать пользователю;
+# таблицу пересчитывает manage.py recommend_follows (posts/recommendations.py)
+RECOMMENDATIONS_PER_USER = 5
@@ -0,0 +1,28 @@
+"""
+PRAGMA из профиля DB_PROFILE для каждого нового соединения с SQLite.
+
+Профиль production:
+    journal_mode=WAL   — читатели не ждут писателя, писатель не ждёт
+                         читателей; режим хранится в файле базы;
+    synchronous=NORMAL — в WAL fsync только при контрольной точке: база
+                         остаётся целой, при сбое питания теряются лишь
+                         последние транзакции;
+    mmap_size          — страницы базы читаются через отображение в память;
+    busy_timeout       — второй писатель ждёт блокировку, а не падает
+                         сразу с «database is locked».
+
+Вместе с CONN_MAX_AGE соединение живёт между запросами, и PRAGMA
+выполняются один раз на поток, а не на каждый запрос.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma in settings.SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {pragma}')
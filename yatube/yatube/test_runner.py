@@ -0,0 +1,29 @@
+"""
+Окружение тестов для manage.py test (TestRunner) и pytest (tests/conftest.py).
+
+Файловый кеш по умолчанию общий для всех процессов машины: тесты с их
+cache.clear() стёрли бы кеш сервера разработки, а его записи попадали
+бы в тесты. Поэтому тесты получают свой кеш в памяти процесса.
+Фоновый пул миниатюр писал бы в MEDIA_ROOT теста, пока тот его удаляет,
+поэтому миниатюры в тестах делаются сразу после коммита.
+"""
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from yatube.caches import cache_settings
+
+TEST_SETTINGS = {
+    'CACHES': cache_settings('locmem://'),
+    'THUMBNAIL_WORKERS': 0,
+}
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.test_settings = override_settings(**TEST_SETTINGS)
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        super().teardown_test_environment(**kwargs)